@@ -1,36 +1,80 @@
-from flask import Flask
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+from flask import Flask, g, request
 from flask import render_template
 import pandas as pd
 
+# Set PROFILE_DIR to profile every request into a folder of its own there.
+PROFILE_DIR = os.environ.get("PROFILE_DIR")
+if PROFILE_DIR:
+    # The profiler is shared with query.py, one folder up.
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from ingest.profiling import StageProfiler
+
 app = Flask(__name__)
+# cProfile profiles one thread at a time, so profiled requests take turns.
+profile_lock = threading.Lock()
+
+
+@app.before_request
+def start_profile():
+    if PROFILE_DIR and request.endpoint != "static":
+        profile_lock.acquire()
+        g.profiler = StageProfiler()
+        g.profiler.start()
+
+
+@app.teardown_request
+def write_profile(exception=None):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return
+    try:
+        profiler.stop()
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        name = f"{stamp}.{int(now * 1000) % 1000:03d}-{request.endpoint}"
+        profiler.write(os.path.join(PROFILE_DIR, name))
+    finally:
+        profile_lock.release()
+
+
+def profiled(stage):
+    """Profiles a block as stage when PROFILE_DIR is set."""
+    profiler = g.get("profiler")
+    return profiler.stage(stage) if profiler is not None else nullcontext()
+
+
+def display_csv(csv_filename, template):
+    with profiled("csv_read"):
+        data = pd.read_csv(csv_filename)
+    with profiled("html_render"):
+        data_to_display = data.to_html(index=False)
+        return render_template(template, table=data_to_display)
 
 
 @app.route("/")
 def display_gpu_data():
-    gpu_data = pd.read_csv("./CSVs/gpu_info.csv")
-    data_to_display = gpu_data.to_html(index=False)
-    return render_template("display_gpu.html", table=data_to_display)
+    return display_csv("./CSVs/gpu_info.csv", "display_gpu.html")
 
 
 @app.route("/cpu")
 def display_cpu_data():
-    cpu_data = pd.read_csv("./CSVs/cpu_info.csv")
-    data_to_display = cpu_data.to_html(index=False)
-    return render_template("display_cpu.html", table=data_to_display)
+    return display_csv("./CSVs/cpu_info.csv", "display_cpu.html")
 
 
 @app.route("/ddr4")
 def display_ddr_four():
-    cpu_data = pd.read_csv("./CSVs/memoryDDR4.csv")
-    data_to_display = cpu_data.to_html(index=False)
-    return render_template("display_ddr4.html", table=data_to_display)
+    return display_csv("./CSVs/memoryDDR4.csv", "display_ddr4.html")
 
 
 @app.route("/ddr5")
 def display_ddr_five():
-    cpu_data = pd.read_csv("./CSVs/memoryDDR5.csv")
-    data_to_display = cpu_data.to_html(index=False)
-    return render_template("display_ddr5.html", table=data_to_display)
+    return display_csv("./CSVs/memoryDDR5.csv", "display_ddr5.html")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+"""Compares batched OR queries against one query per keyword on the local stand-in.
+
+Reports API calls and how the selected lowest prices differ. Nothing is
+written to the CSVs. Run from the repository root:
+
+    python -m benchmarks.bench_batching --batch-size 4
+"""
+
+import argparse
+import asyncio
+import statistics
+
+import aiohttp
+
+import query
+from ingest.fake_ebay import FakeEbayConfig, start_server
+from ingest.scheduler import FetchScheduler
+from ingest.selection import PriceSelector
+
+
+async def refresh(endpoint, keys, batch_size, max_pages):
+    """Fetches every category and returns (calls made, lowest prices by category)."""
+    infos = {
+        key: query.GeneralInfo(query.CATEGORIES[key], endpoint=endpoint, batch_size=batch_size)
+        for key in keys
+    }
+    requests = [request for gen_info in infos.values() for request in gen_info.requests]
+    scheduler = FetchScheduler(64, 0, 64)
+    async with aiohttp.ClientSession(connector=scheduler.connector()) as session:
+        context = query.FetchContext(scheduler, session, infos, max_pages=max_pages)
+        results, _ = await query.fetch_all(context, requests)
+    for request, by_keyword in results:
+        infos[request.category].all_prices.update(by_keyword)
+    query.select_lowest_prices(infos, PriceSelector(), context.index)
+    return scheduler.completed, {
+        key: gen_info.lowest_prices for key, gen_info in infos.items()
+    }
+
+
+async def run(args):
+    keys = args.categories.split(",")
+    runner, endpoint = await start_server(FakeEbayConfig())
+    try:
+        single_calls, single = await refresh(endpoint, keys, 0, args.max_pages)
+        batched_calls, batched = await refresh(
+            endpoint, keys, args.batch_size, args.max_pages
+        )
+    finally:
+        await runner.cleanup()
+
+    print(f"calls, one keyword per call:  {single_calls}")
+    print(f"calls, batched:               {batched_calls}")
+    print(f"saved:                        {1 - batched_calls / single_calls:.1%}")
+    for key in keys:
+        names = set(single[key]) | set(batched[key])
+        both = [name for name in names if name in single[key] and name in batched[key]]
+        same = sum(single[key][name].price == batched[key][name].price for name in both)
+        diffs = [
+            abs(batched[key][name].price - single[key][name].price) / single[key][name].price
+            for name in both
+        ]
+        print(
+            f"{key}: {len(single[key])} priced single, {len(batched[key])} priced batched, "
+            f"{same}/{len(both)} identical, "
+            f"median difference {statistics.median(diffs) if diffs else 0:.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--categories", default="gpu,cpu")
+    parser.add_argument("--batch-size", type=int, default=query.BATCH_SIZE)
+    parser.add_argument("--max-pages", type=int, default=query.MAX_PAGES)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Runs the fetch and filter pipeline against the local eBay stand-in.
+
+The catalog can be repeated to simulate 10x-100x its real size. Nothing is
+written to the CSVs. Run from the repository root:
+
+    python -m benchmarks.bench_offline_refresh --scale 10 --latency 0.05
+
+--workers N decodes responses in a pool, as query.py --workers does. The
+loop lag line is the worst delay of a 10 ms timer during the run, which shows
+how long the event loop was blocked. The stand-in server shares the loop, so
+its rendering time is included.
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+import query
+from ingest.fake_ebay import FakeEbayConfig, start_server
+from ingest.resilience import CircuitBreaker, FetchError, RetryPolicy
+from ingest.scheduler import FetchScheduler
+from ingest.workers import POOLS, make_executor
+
+
+async def watch_lag(lags, interval=0.01):
+    """Appends how late each wake-up of a periodic timer was."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+def scaled_catalog(data_list, scale):
+    """Repeats the catalog, tagging copies so each one is a distinct keyword."""
+    catalog = list(data_list)
+    for copy in range(1, scale):
+        catalog.extend(f"{name} v{copy}" for name in data_list)
+    return catalog
+
+
+async def run(args):
+    config = FakeEbayConfig(
+        latency=args.latency,
+        jitter=args.latency / 2,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    runner, endpoint = await start_server(config)
+    try:
+        infos = {
+            key: query.GeneralInfo(query.CATEGORIES[key], endpoint=endpoint)
+            for key in args.categories.split(",")
+        }
+        requests = []
+        for key, gen_info in infos.items():
+            builder = query.RequestBuilder(endpoint, query.params, key)
+            requests += builder.build_all(scaled_catalog(gen_info.data_list, args.scale))
+        scheduler = FetchScheduler(
+            args.max_in_flight,
+            args.rps,
+            args.per_host,
+            RetryPolicy(args.attempts, base_delay=0.05),
+            CircuitBreaker(cooldown=1.0),
+        )
+        executor = (
+            make_executor(
+                args.pool,
+                args.workers,
+                {key: gen_info.title_filter for key, gen_info in infos.items()},
+                requests,
+            )
+            if args.workers
+            else None
+        )
+        lags = []
+        watcher = asyncio.create_task(watch_lag(lags))
+        start = time.perf_counter()
+        async with aiohttp.ClientSession(connector=scheduler.connector()) as session:
+            context = query.FetchContext(
+                scheduler,
+                session,
+                infos,
+                executor=executor,
+                max_pages=args.max_pages,
+            )
+            results, _ = await query.fetch_all(context, requests)
+        elapsed = time.perf_counter() - start
+        watcher.cancel()
+        if executor is not None:
+            executor.shutdown()
+    finally:
+        await runner.cleanup()
+
+    stats = runner.app["stats"]
+    failed = sum(isinstance(result, FetchError) for result in results)
+    accepted = sum(
+        cheapest.seen
+        for result in results
+        if not isinstance(result, FetchError)
+        for cheapest in result[1].values()
+    )
+    print(f"keywords:     {len(requests)}")
+    print(f"requests:     {stats.requests} {dict(sorted(stats.statuses.items()))}")
+    print(f"retries:      {scheduler.retries}")
+    print(f"failed:       {failed}")
+    print(f"accepted:     {accepted}")
+    print(f"elapsed:      {elapsed:.2f}s")
+    print(f"throughput:   {len(requests) / elapsed:.1f} keywords/s")
+    print(f"loop lag:     max {max(lags, default=0) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--categories", default="gpu,cpu")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--attempts", type=int, default=4)
+    parser.add_argument("--max-pages", type=int, default=query.MAX_PAGES)
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--rps", type=float, default=0)
+    parser.add_argument("--per-host", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--pool", choices=sorted(POOLS), default="process")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
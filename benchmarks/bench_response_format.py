@@ -0,0 +1,65 @@
+"""Compares the XML and JSON response formats by size and decode time.
+
+Renders pages of synthetic listings with the local stand-in and decodes them
+with the decoder query.py would use for each format. Run from the repository
+root:
+
+    python -m benchmarks.bench_response_format --pages 200
+"""
+
+import argparse
+import gzip
+import time
+
+from ingest.decode import DECODERS
+from ingest.fake_ebay import FakeEbayConfig, find_items, render_json, render_xml
+
+RENDERERS = {"XML": render_xml, "JSON": render_json}
+CHUNK_SIZE = 16 * 1024
+
+
+def decode(response_format, body):
+    """Decodes one body the way fetch_page does, in CHUNK_SIZE chunks."""
+    decoder = DECODERS[response_format]()
+    records = []
+    for start in range(0, len(body), CHUNK_SIZE):
+        records.extend(decoder.feed(body[start : start + CHUNK_SIZE]))
+    records.extend(decoder.close())
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config = FakeEbayConfig(max_entries=100)
+    pages = [
+        find_items(config, {}, f"GeForce RTX {4000 + index}", 1, 100)
+        for index in range(args.pages)
+    ]
+    items = sum(len(page_items) for page_items, _ in pages)
+
+    decoded = {}
+    print(f"{'format':<8}{'bytes/100':>12}{'gzip/100':>12}{'decode ms/100':>16}")
+    for response_format, render in RENDERERS.items():
+        bodies = [render(page_items, 1, 100, total).encode() for page_items, total in pages]
+        size = sum(len(body) for body in bodies)
+        compressed = sum(len(gzip.compress(body)) for body in bodies)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            records = [record for body in bodies for record in decode(response_format, body)]
+            best = min(best, time.perf_counter() - start)
+        decoded[response_format] = [tuple(record) for record in records]
+        scale = 100 / items
+        print(
+            f"{response_format:<8}{size * scale:>12,.0f}{compressed * scale:>12,.0f}"
+            f"{best * 1000 * scale:>16.3f}"
+        )
+    print(f"records match: {decoded['XML'] == decoded['JSON']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compares the compiled title filter against the original banned_words loop.
+
+Run from the repository root: python -m benchmarks.bench_title_filter
+"""
+
+import argparse
+import random
+import time
+
+from dataBase.cpu import cpus
+from dataBase.gpu import graphics_cards
+from ingest.filters import TitleFilter
+from ingest.categories import banned_words, extract_number, extract_superlative
+
+NOISE = [
+    "Used", "Tested", "Working", "OEM", "Tray", "Boxed", "Fast Shipping", "LGA1700",
+    "AM5", "Desktop Processor", "Graphics Card", "8GB GDDR6", "Founders Edition",
+    "Gaming OC", "Free Shipping", "Great Condition", "w/ Box",
+]
+
+
+def legacy_accept(title, keyword_number, superlative):
+    """The per-word loop fetch_data used before, without its print calls."""
+    if keyword_number and keyword_number not in title:
+        return False
+    if superlative and superlative not in title.upper():
+        return False
+    for banned_word in banned_words:
+        if banned_word.lower() in title.lower():
+            return False
+    return True
+
+
+def synthetic_titles(count, seed):
+    """Builds listing titles mixing catalog names, noise and banned words."""
+    rng = random.Random(seed)
+    keywords = cpus + graphics_cards
+    titles = []
+    for _ in range(count):
+        keyword = rng.choice(keywords)
+        parts = [keyword] + rng.sample(NOISE, 3)
+        if rng.random() < 0.2:
+            parts.append(rng.choice(banned_words))
+        if rng.random() < 0.1:
+            parts[0] = rng.choice(keywords)
+        rng.shuffle(parts)
+        titles.append((keyword, " ".join(parts)))
+    return titles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    titles = synthetic_titles(args.titles, args.seed)
+    title_filter = TitleFilter(banned_words, extract_number, extract_superlative)
+    matchers = {}
+    legacy_args = {}
+    for keyword, _ in titles:
+        if keyword not in matchers:
+            matchers[keyword] = title_filter.matcher(keyword)
+            legacy_args[keyword] = (extract_number(keyword), extract_superlative(keyword))
+
+    start = time.perf_counter()
+    legacy = [legacy_accept(title, *legacy_args[keyword]) for keyword, title in titles]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [matchers[keyword](title).accepted for keyword, title in titles]
+    compiled_time = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(legacy, compiled))
+    print(f"titles:       {len(titles)}")
+    print(f"accepted:     {sum(compiled)}")
+    print(f"mismatches:   {mismatches}")
+    print(f"legacy loop:  {legacy_time:.3f}s")
+    print(f"compiled:     {compiled_time:.3f}s")
+    print(f"speedup:      {legacy_time / compiled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Atomic file writes, so readers such as the website never see a partial file."""
+
+import os
+from contextlib import contextmanager, suppress
+
+
+@contextmanager
+def atomic_write(path, mode="w", newline=None):
+    """Yields a temporary file next to path and moves it over path once the block succeeds.
+
+    The temporary name carries the process ID, so processes writing the same
+    path, such as shards sharing a cache, never write into one file. If the
+    block fails the temporary file is removed and path is left untouched.
+    """
+    path = os.fspath(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    encoding = None if "b" in mode else "utf-8"
+    try:
+        with open(tmp_path, mode, newline=newline, encoding=encoding) as file:
+            yield file
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,89 @@
+"""Combines closely related catalog keywords into OR-style or broad Finding API queries."""
+
+import re
+
+from ingest.filters import title_tokens
+
+# A keyword's model stem runs up to its first number of three or more digits,
+# e.g. "Intel Core i5-14600" for "Intel Core i5-14600KF".
+MODEL_STEM = re.compile(r"^(.*?\d{3,})")
+
+
+def model_stem(keyword):
+    match = MODEL_STEM.match(keyword)
+    return match.group(1) if match else keyword
+
+
+def combined_query(members):
+    """Builds "prefix (tail,tail,...)" from the words the members share and the rest."""
+    words = [member.split() for member in members]
+    prefix = []
+    for column in zip(*words):
+        if len(set(column)) != 1:
+            break
+        prefix.append(column[0])
+    tails = []
+    for member_words in words:
+        tail = " ".join(member_words[len(prefix):])
+        tails.append(f'"{tail}"' if " " in tail else tail)
+    return " ".join(prefix + [f"({','.join(tails)})"])
+
+
+def plan_requests(builder, keywords, batch_size):
+    """Returns the requests for a catalog, batching keywords that share a model stem.
+
+    A keyword that is its own stem (e.g. "GeForce RTX 4070") is searched alone,
+    since it has no token of its own to tell its listings apart from the variants.
+    """
+    groups = {}
+    for keyword in keywords:
+        groups.setdefault(model_stem(keyword), []).append(keyword)
+    requests = []
+    for stem, members in groups.items():
+        variants = [member for member in members if member != stem]
+        requests.extend(builder.build(member) for member in members if member == stem)
+        for start in range(0, len(variants), batch_size):
+            chunk = variants[start : start + batch_size]
+            if len(chunk) == 1:
+                requests.append(builder.build(chunk[0]))
+            else:
+                requests.append(builder.build(combined_query(chunk), chunk))
+    return requests
+
+
+def plan_broad_requests(builder, keywords, queries):
+    """Returns one request per broad query plus single requests for what they miss.
+
+    Each keyword goes to the first query whose words it contains, e.g.
+    "GeForce RTX 4070" to "GeForce RTX".
+    """
+    query_tokens = [(query, title_tokens(query)) for query in queries]
+    members = {query: [] for query in queries}
+    requests = []
+    for keyword in keywords:
+        tokens = title_tokens(keyword)
+        query = next((query for query, words in query_tokens if words <= tokens), None)
+        if query is None:
+            requests.append(builder.build(keyword))
+        else:
+            members[query].append(keyword)
+    requests.extend(
+        builder.build(query, covered, broad=True)
+        for query, covered in members.items()
+        if covered
+    )
+    return requests
+
+
+def plan_search_requests(builder, keywords, search_query):
+    """Returns one request per distinct search query the keywords map to.
+
+    Keywords sharing a query, e.g. one module sold under two brands, are its
+    members. Keywords without a query are not searched.
+    """
+    members = {}
+    for keyword in keywords:
+        query = search_query(keyword)
+        if query is not None:
+            members.setdefault(query, []).append(keyword)
+    return [builder.build(query, covered) for query, covered in members.items()]
@@ -0,0 +1,89 @@
+"""On-disk cache of decoded Finding API responses."""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import suppress
+from pathlib import Path
+
+from ingest.atomic import atomic_write
+from ingest.listing import Listing
+
+
+class ResponseCache:
+    """Content-addressed cache of decoded listings, keyed on the encoded request.
+
+    Entries are JSON files named after the SHA-256 of the request URL. A hit
+    refreshes the file's mtime, so evicting the oldest mtimes first gives LRU
+    order once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, max_age=None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, url):
+        digest = hashlib.sha256(str(url).encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / f"{digest}.json"
+
+    def get(self, url, ttl):
+        """Returns (records, total_pages) for a request, or None when missing or stale."""
+        max_age = self.max_age if self.max_age is not None else ttl
+        path = self._path(url)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        if time.time() - entry["fetched_at"] > max_age:
+            self.misses += 1
+            return None
+        # Another process sharing the cache, e.g. a shard, may have just
+        # evicted the entry; the records read above are still good.
+        with suppress(FileNotFoundError):
+            os.utime(path)
+        self.hits += 1
+        records = [Listing(*record) for record in entry["records"]]
+        return records, entry.get("total_pages", 1)
+
+    def put(self, url, records, total_pages=1):
+        """Stores the decoded records of a results page."""
+        path = self._path(url)
+        entry = {
+            "url": str(url),
+            "fetched_at": time.time(),
+            "records": [list(record) for record in records],
+            "total_pages": total_pages,
+        }
+        with atomic_write(path) as file:
+            json.dump(entry, file)
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes.
+
+        Shards can share a cache directory and evict at the same time, so
+        entries another process removed first are skipped.
+        """
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,266 @@
+"""The component categories tracked on the website and their per-category rules."""
+
+import csv
+import re
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional, Sequence
+
+from dataBase.cpu import cpus
+from dataBase.gpu import graphics_cards
+
+banned_words = [
+    "shroud",
+    "cable",
+    "bracket",
+    "empty",
+    "shield",
+    "kit",
+    "powerlink",
+    "bios",
+    "block",
+    "backplate",
+    "back plate",
+    "box-only",
+    "mining",
+    "cooling fan",
+    "graphics card fan",
+    "cooler fan",
+    "box only",
+    "only fan",
+    "parts only",
+    "no gpu",
+    "heatsink",
+    "heat sink",
+    "untested",
+    "1700 Cooler",
+    " es ",
+    "box only",
+    "confidential",
+    "merch",
+    "nvlink",
+    "connector"
+]
+
+# Memory is often sold as a kit or with a heatsink, so only the junk listings
+# from the list above apply.
+memory_banned_words = [
+    "empty",
+    "box-only",
+    "box only",
+    "parts only",
+    "untested",
+    "confidential",
+]
+
+
+def extract_number(keyword):
+    """Extracts the important 4-digit or 5-digit CPU number from the keyword."""
+    match = re.search(r'\d{4,5}', keyword)
+    return match.group(0) if match else None
+
+
+def extract_superlative(keyword):
+    """Extracts the important keyword 'TI', 'SUPER', or 'TI SUPER' from the input string."""
+    if 'TI SUPER' in keyword.upper():
+        return 'TI SUPER'
+    elif 'TI' in keyword.upper():
+        return 'TI'
+    elif 'SUPER' in keyword.upper():
+        return 'SUPER'
+    else:
+        return None
+
+
+# Tokens of a memory module name that give its specs rather than its part
+# number: capacity, speed, generation, CAS latency and JEDEC speed grades.
+MEMORY_SPEC = re.compile(
+    r"\d+(GB|MHZ|MT/S)|DDR\d\w*|CL?\d+(-\d+)*|D\d-\d+|PC\d-\d+\w*", re.I
+)
+
+# Short retail brands for the manufacturer names the memory catalogs use.
+# Manufacturers missing here are searched by part number and capacity alone.
+MEMORY_BRANDS = {
+    "Kingston": "Kingston",
+    "Crucial Technology": "Crucial",
+    "Corsair": "Corsair",
+    "Micron Technology": "Micron",
+    "Samsung": "Samsung",
+    "SK Hynix": "Hynix",
+    "Hynix Semiconductor": "Hynix",
+    "A-DATA Technology": "ADATA",
+    "Apacer Technology": "Apacer",
+    "Patriot Memory": "Patriot",
+    "PNY Technologies,": "PNY",
+    "Lexar Co": "Lexar",
+    "Thermaltake Technology": "Thermaltake",
+    "Transcend Information": "Transcend",
+    "Mushkin": "Mushkin",
+}
+
+
+def extract_part_number(keyword):
+    """Extracts the part number from a memory module name, or None when it has none.
+
+    The part number is the longest token with both letters and digits that is
+    not a spec such as "16GB", "DDR4-3200" or "CL16".
+    """
+    tokens = [
+        token
+        for token in (raw.strip('()*",#').lstrip("-") for raw in keyword.split())
+        if len(token) >= 5
+        and re.search(r"\d", token)
+        and re.search(r"[A-Za-z]", token)
+        and not MEMORY_SPEC.fullmatch(token)
+    ]
+    return max(tokens, key=len) if tokens else None
+
+
+def memory_query(name):
+    """The search query for a memory module: short brand, part number and capacity.
+
+    Catalog names carry legal words ("Limited", "Technology") and parentheses
+    the Finding API reads as OR syntax, so they are not searched as they are.
+    Returns None for a module without a part number, which is not searched.
+    """
+    part_number = extract_part_number(name)
+    if part_number is None:
+        return None
+    brand = next(
+        (
+            short
+            for prefix, short in MEMORY_BRANDS.items()
+            if name == prefix or name.startswith(f"{prefix} ")
+        ),
+        None,
+    )
+    capacity = re.search(r"\b\d+GB\b", name)
+    return " ".join(
+        word for word in (brand, part_number, capacity and capacity.group(0)) if word
+    )
+
+
+def _csv_names(csv_filename, column):
+    """Reads a catalog from the name column of a CSV, skipping blanks and duplicates."""
+    with open(csv_filename, mode="r", encoding="utf-8") as file:
+        return list(
+            dict.fromkeys(row[column] for row in csv.DictReader(file) if row[column])
+        )
+
+
+def _efficiency(score, divisor):
+    return f"{(score / divisor) if divisor != 0 else float('inf'):.4f}"
+
+
+@dataclass(frozen=True)
+class Category:
+    """Catalog, filters, CSV schema and efficiency columns for one component type."""
+
+    key: str
+    csv_filename: str
+    name_column: str
+    score_column: str
+    price_efficiency_column: str
+    load_catalog: Callable[[], Sequence[str]]
+    banned_words: Sequence[str]
+    cache_ttl: float
+    batchable: bool = False
+    broad_queries: Sequence[str] = ()
+    power_efficiency_column: Optional[str] = None
+    extract_number: Optional[Callable[[str], Optional[str]]] = None
+    extract_superlative: Optional[Callable[[str], Optional[str]]] = None
+    # Builds the query searched for a catalog name when it differs from the name.
+    search_query: Optional[Callable[[str], Optional[str]]] = None
+
+    def update_row(self, row, lowest):
+        """Writes the lowest listing into a CSV row and recomputes its efficiencies."""
+        if lowest is not None:
+            row["Price ($)"] = f"{lowest.price:,.2f}"
+            row["URL"] = lowest.url
+        score = float(row[self.score_column].replace(",", ""))
+        if self.power_efficiency_column:
+            row[self.power_efficiency_column] = _efficiency(score, float(row["TDP"]))
+        if not row["Price ($)"]:
+            return
+        price = float(row["Price ($)"].replace(",", ""))
+        row[self.price_efficiency_column] = _efficiency(score, price)
+        if self.power_efficiency_column:
+            price_efficiency = float(row[self.price_efficiency_column])
+            power_efficiency = float(row[self.power_efficiency_column])
+            row["Average Efficiency"] = (
+                f"{(price_efficiency + power_efficiency) / 2:.4f}"
+            )
+
+
+GPU = Category(
+    key="gpu",
+    csv_filename="Website/CSVs/gpu_info.csv",
+    name_column="Card",
+    score_column="FPS",
+    price_efficiency_column="Price Efficiency (FPS/$)",
+    power_efficiency_column="Power Efficiency (FPS/W)",
+    load_catalog=partial(list, graphics_cards),
+    banned_words=banned_words,
+    cache_ttl=6 * 60 * 60,
+    batchable=True,
+    broad_queries=("GeForce RTX", "GeForce GTX", "Radeon RX", "Intel Arc"),
+    extract_superlative=extract_superlative,
+)
+
+CPU = Category(
+    key="cpu",
+    csv_filename="Website/CSVs/cpu_info.csv",
+    name_column="Name",
+    score_column="Score",
+    price_efficiency_column="Price Efficiency (Score/$)",
+    power_efficiency_column="Power Efficiency (Score/W)",
+    load_catalog=partial(list, cpus),
+    banned_words=banned_words,
+    cache_ttl=12 * 60 * 60,
+    batchable=True,
+    broad_queries=(
+        "AMD Ryzen Threadripper",
+        "AMD Ryzen 9",
+        "AMD Ryzen 7",
+        "AMD Ryzen 5",
+        "AMD Ryzen 3",
+        "Intel Core i9",
+        "Intel Core i7",
+        "Intel Core i5",
+        "Intel Core i3",
+    ),
+    extract_number=extract_number,
+    extract_superlative=extract_superlative,
+)
+
+DDR4 = Category(
+    key="ddr4",
+    csv_filename="Website/CSVs/memoryDDR4.csv",
+    name_column="Module",
+    score_column="Score",
+    price_efficiency_column="Price Efficiency (Score/$)",
+    load_catalog=partial(_csv_names, "Website/CSVs/memoryDDR4.csv", "Module"),
+    banned_words=memory_banned_words,
+    cache_ttl=24 * 60 * 60,
+    extract_number=extract_part_number,
+    search_query=memory_query,
+)
+
+DDR5 = Category(
+    key="ddr5",
+    csv_filename="Website/CSVs/memoryDDR5.csv",
+    name_column="Module",
+    score_column="Score",
+    price_efficiency_column="Price Efficiency (Score/$)",
+    load_catalog=partial(_csv_names, "Website/CSVs/memoryDDR5.csv", "Module"),
+    banned_words=memory_banned_words,
+    cache_ttl=24 * 60 * 60,
+    extract_number=extract_part_number,
+    search_query=memory_query,
+)
+
+CATEGORIES = {category.key: category for category in (GPU, CPU, DDR4, DDR5)}
+
+# Refreshed when --categories is not given. The memory categories are left out
+# until their part number queries have been checked against live results.
+DEFAULT_CATEGORIES = ("gpu", "cpu")
@@ -0,0 +1,123 @@
+"""Reverse index from model tokens to catalog components, for classifying titles.
+
+Each catalog name is split into its model number, the suffix that follows it
+(e.g. "K", "X3D", "Ti Super"), an optional VRAM variant and the family words
+around it (brand, series and tier). Titles are looked up by the model numbers
+they contain, so classifying one costs a few dictionary lookups however large
+the catalog is.
+"""
+
+import re
+from typing import FrozenSet, NamedTuple, Optional
+
+# A model number token, e.g. "14900k", "7950x3d", "a770" or "rtx4090". A single
+# leading letter is part of the number (Arc "A770"); a longer one is a family word.
+_MODEL = re.compile(r"^([a-z]*?)(\d{3,5})([a-z][a-z0-9]*)?$")
+_VRAM = re.compile(r"(\d{1,3})\s*gb\b")
+
+# Words that, right after a model number, make it a different product.
+SUFFIX_WORDS = frozenset(
+    ["ti", "super", "xt", "xtx", "gre", "x", "x3d", "k", "kf", "ks", "f", "t", "wx"]
+)
+
+# Brand words say little on their own, so they only count as a series word for
+# names that have nothing else, e.g. "Intel 300".
+BRANDS = frozenset(["amd", "intel", "nvidia"])
+
+
+class ModelKey(NamedTuple):
+    """The parts of a catalog name that tell it apart from its neighbours."""
+
+    name: str
+    number: Optional[str]
+    suffix: FrozenSet[str]
+    vram: Optional[str]
+    family: FrozenSet[str]
+    series: FrozenSet[str]
+
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _models(tokens):
+    """Yields (number, suffix, extra family word) for each model number in a token list."""
+    for position, token in enumerate(tokens):
+        match = _MODEL.match(token)
+        if match is None:
+            continue
+        prefix, digits, attached = match.groups()
+        if attached == "gb":
+            continue
+        number = prefix + digits if len(prefix) == 1 else digits
+        suffix = {attached} if attached else set()
+        for word in tokens[position + 1 :]:
+            if word not in SUFFIX_WORDS:
+                break
+            suffix.add(word)
+        yield number, frozenset(suffix), prefix if len(prefix) > 1 else None
+
+
+def parse_name(name):
+    """Splits a catalog name into its ModelKey."""
+    tokens = _tokens(name)
+    vram = _VRAM.search(name.lower())
+    models = list(_models(tokens))
+    number, suffix = (models[0][0], models[0][1]) if models else (None, frozenset())
+    family = frozenset(
+        token
+        for token in tokens
+        if not _MODEL.match(token) and not token.endswith("gb") and token not in suffix
+    )
+    series = frozenset(
+        word for word in family if word not in BRANDS and not word.isdigit()
+    )
+    return ModelKey(
+        name, number, suffix, vram.group(1) if vram else None, family, series
+    )
+
+
+class ComponentIndex:
+    """Maps model numbers to the catalog components that carry them."""
+
+    def __init__(self, names):
+        self.by_number = {}
+        # Names without a model number ("Radeon VII", "Titan RTX") are few and
+        # matched on all of their words.
+        self.unnumbered = []
+        for name in names:
+            key = parse_name(name)
+            if key.number is None:
+                self.unnumbered.append(key)
+            else:
+                self.by_number.setdefault(key.number, []).append(key)
+
+    def classify(self, title):
+        """Returns the most specific component a title describes, or None."""
+        tokens = _tokens(title)
+        words = set(tokens)
+        vrams = set(_VRAM.findall(title.lower()))
+        best = None
+        best_score = -1
+        for number, suffix, family_word in _models(tokens):
+            if family_word:
+                words.add(family_word)
+            for key in self.by_number.get(number, ()):
+                if key.suffix != suffix or (key.vram and key.vram not in vrams):
+                    continue
+                # Model numbers repeat across lines (Ryzen 9 7900, Radeon RX 7900),
+                # so a series word must be in the title too.
+                series = key.series or key.family
+                if not series & words:
+                    continue
+                found = len(key.family & words)
+                score = 2 * found - len(key.family) + len(key.suffix) + 2 * bool(key.vram)
+                if score > best_score:
+                    best, best_score = key.name, score
+        if best is None:
+            for key in self.unnumbered:
+                if key.family <= words and (key.vram is None or key.vram in vrams):
+                    score = len(key.family)
+                    if score > best_score:
+                        best, best_score = key.name, score
+        return best
@@ -0,0 +1,109 @@
+"""Long-running refresh loop with a small HTTP status endpoint."""
+
+import asyncio
+import time
+import traceback
+
+from aiohttp import web
+
+from ingest.metrics import CONTENT_TYPE
+
+
+class RefreshDaemon:
+    """Runs refresh cycles on a fixed schedule and keeps track of how they went.
+
+    The interval is measured between cycle starts; a cycle that overruns it is
+    followed by the next one straight away. A failing cycle is logged and the
+    schedule carries on.
+    """
+
+    def __init__(self, cycle, interval):
+        self.cycle = cycle
+        self.interval = interval
+        self.started_at = time.time()
+        self.cycles = 0
+        self.failed_cycles = 0
+        self.running = False
+        self.next_run = None
+        self.last_cycle = None
+        self.last_error = None
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        """Asks the daemon to exit once the current cycle finishes."""
+        print("Stopping after the current cycle.")
+        self._stop.set()
+
+    def status(self):
+        """A JSON-serializable summary of the daemon's state."""
+        return {
+            "started_at": self.started_at,
+            "interval": self.interval,
+            "cycles": self.cycles,
+            "failed_cycles": self.failed_cycles,
+            "running": self.running,
+            "next_run": self.next_run,
+            "last_cycle": self.last_cycle,
+            "last_error": self.last_error,
+        }
+
+    async def run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            self.running = True
+            self.next_run = None
+            try:
+                summary = await self.cycle()
+            except Exception as error:
+                self.failed_cycles += 1
+                self.last_error = repr(error)
+                traceback.print_exc()
+            else:
+                finished = time.time()
+                self.last_cycle = {
+                    "started": started,
+                    "finished": finished,
+                    "duration": finished - started,
+                    **summary,
+                }
+            finally:
+                self.running = False
+                self.cycles += 1
+            self.next_run = started + self.interval
+            try:
+                await asyncio.wait_for(
+                    self._stop.wait(), timeout=max(0.0, self.next_run - time.time())
+                )
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _handle_status(request):
+    return web.json_response(request.app["daemon"].status())
+
+
+async def _handle_metrics(request):
+    return web.Response(
+        body=request.app["registry"].render().encode("utf-8"),
+        headers={"Content-Type": CONTENT_TYPE},
+    )
+
+
+async def start_status_server(daemon, host, port, registry=None):
+    """Serves the daemon status as JSON on /status and returns the runner.
+
+    With a metrics registry, its current state is served on /metrics too.
+    """
+    app = web.Application()
+    app["daemon"] = daemon
+    app.router.add_get("/status", _handle_status)
+    if registry is not None:
+        app["registry"] = registry
+        app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Daemon status on http://{host}:{port}/status")
+    if registry is not None:
+        print(f"Metrics on http://{host}:{port}/metrics")
+    return runner
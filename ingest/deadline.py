@@ -0,0 +1,104 @@
+"""Run-wide deadline split into time budgets for the stages of a refresh."""
+
+import argparse
+import json
+import time
+from contextlib import contextmanager
+
+from ingest.atomic import atomic_write
+
+STAGES = ("fetch", "select", "write")
+
+# Overruns shorter than this, such as cancelled fetches closing their
+# connections, are not reported.
+OVERRUN_TOLERANCE = 0.5
+
+# Freshness of a component after a refresh: every page it needed was read
+# from the network, some came from the response cache, the deadline cut its
+# search short, or it was not fetched at all and keeps its previous price.
+FRESH = "fresh"
+CACHED = "cached"
+PARTIAL = "partial"
+STALE = "stale"
+
+
+def parse_shares(text):
+    """Parses "fetch,select,write" shares of the deadline, e.g. "8,1,1", for argparse."""
+    try:
+        shares = [float(part) for part in text.split(",")]
+    except ValueError:
+        shares = []
+    if len(shares) != len(STAGES) or any(share <= 0 for share in shares):
+        raise argparse.ArgumentTypeError(
+            f"expected {len(STAGES)} positive shares, got {text!r}"
+        )
+    total = sum(shares)
+    return {stage: share / total for stage, share in zip(STAGES, shares)}
+
+
+class RunDeadline:
+    """A deadline for one refresh, with a share of it budgeted to each stage.
+
+    The select and write budgets are held back from the fetch stage, so
+    fetching stops early enough for the results to be written in time. A stage
+    that finishes early leaves its unused time to the stages after it. With
+    seconds None there is no deadline and stages are only timed.
+    """
+
+    def __init__(self, seconds, shares, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = None if seconds is None else clock() + seconds
+        self.budgets = {
+            stage: 0.0 if seconds is None else seconds * shares[stage]
+            for stage in STAGES
+        }
+        self.elapsed = {}
+
+    def remaining(self):
+        """Seconds left before the deadline, never negative, or None without one."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self.clock())
+
+    def timeout(self, stage):
+        """Seconds a stage may run: what is left, less the budgets of the later stages."""
+        if self.expires_at is None:
+            return None
+        later = STAGES[STAGES.index(stage) + 1 :]
+        return max(0.0, self.remaining() - sum(self.budgets[name] for name in later))
+
+    @contextmanager
+    def stage(self, name):
+        """Times one stage and reports it when it ran past its time."""
+        allowed = self.timeout(name)
+        started_at = self.clock()
+        try:
+            yield allowed
+        finally:
+            self.elapsed[name] = self.clock() - started_at
+            overrun = 0.0 if allowed is None else self.elapsed[name] - allowed
+            if overrun > OVERRUN_TOLERANCE:
+                print(
+                    f"The {name} stage took {self.elapsed[name]:.1f}s, "
+                    f"{overrun:.1f}s over its budget."
+                )
+
+
+def update_freshness(path, freshness, now=None):
+    """Records the freshness of every component a refresh covered.
+
+    freshness is {category: {component: FRESH, CACHED, PARTIAL or STALE}}.
+    Components a refresh did not cover keep their earlier entry.
+    """
+    now = time.time() if now is None else now
+    try:
+        with open(path, encoding="utf-8") as file:
+            state = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    for category, flags in freshness.items():
+        entries = state.setdefault(category, {})
+        for name, flag in flags.items():
+            entries[name] = {"freshness": flag, "checked_at": now}
+    with atomic_write(path) as file:
+        json.dump(state, file, indent=2, sort_keys=True)
@@ -0,0 +1,160 @@
+"""Decoders for findItemsByKeywords responses in the XML and JSON formats."""
+
+import json
+import xml.etree.ElementTree as ET
+
+from ingest.listing import Listing
+
+NAMESPACE = "{http://www.ebay.com/marketplace/search/v1/services}"
+
+_SEARCH_RESULT = NAMESPACE + "searchResult"
+_ITEM = NAMESPACE + "item"
+_TOTAL_PAGES = NAMESPACE + "totalPages"
+_FIELDS = {
+    NAMESPACE + "itemId": "item_id",
+    NAMESPACE + "title": "title",
+    NAMESPACE + "viewItemURL": "url",
+    NAMESPACE + "currentPrice": "price",
+    NAMESPACE + "conditionDisplayName": "condition",
+}
+
+
+class ItemStreamDecoder:
+    """Feeds response chunks to a pull parser and yields one record per <item>.
+
+    Records are Listing objects. Each item is dropped from
+    the tree once decoded, so memory is bounded by a single item. total_pages
+    is read from paginationOutput once the parser reaches it.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._search_result = None
+        self._fields = None
+        self.found_search_result = False
+        self.total_pages = 1
+
+    def feed(self, chunk):
+        """Parses the next chunk and returns the items it completed."""
+        self._parser.feed(chunk)
+        return self._records()
+
+    def close(self):
+        """Finishes the document and returns any items left in the parser."""
+        self._parser.close()
+        return self._records()
+
+    def _records(self):
+        for event, elem in self._parser.read_events():
+            tag = elem.tag
+            if event == "start":
+                if tag == _ITEM:
+                    self._fields = {}
+                elif tag == _SEARCH_RESULT:
+                    self._search_result = elem
+                    self.found_search_result = True
+                continue
+            if self._fields is None:
+                if tag == _TOTAL_PAGES and elem.text:
+                    self.total_pages = int(elem.text)
+                continue
+            if tag == _ITEM:
+                yield _to_record(self._fields)
+                self._fields = None
+                self._search_result.remove(elem)
+            elif tag in _FIELDS:
+                self._fields[_FIELDS[tag]] = elem.text
+
+
+def _to_record(fields):
+    price = fields.get("price")
+    return Listing(
+        float(price.replace(",", "")) if price is not None else float("inf"),
+        fields.get("title") or "N/A",
+        fields.get("url") or "N/A",
+        fields.get("condition") or "N/A",
+        fields.get("item_id") or "",
+    )
+
+
+class MalformedResponse(ValueError):
+    """A body that parses but does not have the shape of a search response."""
+
+
+class JsonItemDecoder:
+    """Buffers a JSON response and decodes its items once the body is complete.
+
+    Has the same interface as ItemStreamDecoder, but feed() never yields
+    anything since the standard json module cannot parse partial documents.
+    Every value in the JSON format is wrapped in a list, e.g. "title": ["..."].
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.found_search_result = False
+        self.total_pages = 1
+
+    def feed(self, chunk):
+        """Buffers the next chunk."""
+        self._chunks.append(chunk)
+        return ()
+
+    def close(self):
+        """Parses the buffered document and returns all of its items."""
+        document = json.loads(b"".join(self._chunks))
+        # The envelope is {"findItemsByKeywordsResponse": [{...}]}.
+        envelope = (
+            next(iter(document.values()), None) if isinstance(document, dict) else None
+        )
+        if not (
+            isinstance(envelope, list) and envelope and isinstance(envelope[0], dict)
+        ):
+            raise MalformedResponse("not a findItemsByKeywords response")
+        response = envelope[0]
+        pagination = _first(response, "paginationOutput")
+        if pagination and _first(pagination, "totalPages"):
+            self.total_pages = int(_first(pagination, "totalPages"))
+        search_result = _first(response, "searchResult")
+        if search_result is None:
+            return []
+        self.found_search_result = True
+        return [_json_record(item) for item in search_result.get("item", [])]
+
+
+def _first(node, key):
+    values = node.get(key)
+    return values[0] if values else None
+
+
+def _json_record(item):
+    price = _first(_first(item, "sellingStatus") or {}, "currentPrice")
+    return _to_record(
+        {
+            "item_id": _first(item, "itemId"),
+            "title": _first(item, "title"),
+            "url": _first(item, "viewItemURL"),
+            "price": price["__value__"] if price else None,
+            "condition": _first(_first(item, "condition") or {}, "conditionDisplayName"),
+        }
+    )
+
+
+# Decoder for each RESPONSE-DATA-FORMAT, and the errors a malformed body raises.
+# The lookup errors cover items and fields of an unexpected type or shape.
+DECODERS = {"XML": ItemStreamDecoder, "JSON": JsonItemDecoder}
+DECODE_ERRORS = (
+    ET.ParseError,
+    ValueError,
+    KeyError,
+    IndexError,
+    TypeError,
+    AttributeError,
+)
+
+
+def decode_items(content, response_format="XML"):
+    """Decodes a complete response body into a list of records."""
+    decoder = DECODERS[response_format]()
+    records = list(decoder.feed(content))
+    records.extend(decoder.close())
+    return records
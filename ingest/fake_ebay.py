@@ -0,0 +1,398 @@
+"""Local stand-in for the eBay Finding API, for offline load testing.
+
+Implements findItemsByKeywords with the same XML namespace, JSON layout and
+pagination fields as the live service. Responses are synthesized from the keyword, or
+served from recorded responses in a fixtures folder, with configurable
+latency, server errors and 429 throttling.
+
+Run from the repository root:
+
+    python -m ingest.fake_ebay --port 8081 --latency 0.05 --throttle-rate 0.02
+    EBAY_ENDPOINT=http://127.0.0.1:8081/services/search/FindingService/v1 python query.py
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+from dataBase.cpu import cpus
+from dataBase.gpu import graphics_cards
+from ingest.decode import NAMESPACE, decode_items
+from ingest.filters import title_tokens
+
+PATH = "/services/search/FindingService/v1"
+MAX_ENTRIES_PER_PAGE = 100
+MAX_PAGES = 100
+
+CONDITIONS = [
+    ("1000", "New"),
+    ("2000", "Certified - Refurbished"),
+    ("3000", "Used"),
+    ("4000", "Very Good"),
+    ("5000", "Good"),
+    ("6000", "Acceptable"),
+]
+EXTRAS = [
+    "Tested", "Working", "OEM", "Fast Shipping", "Free Shipping", "Boxed",
+    "Great Condition", "Desktop", "Gaming", "Open Box",
+]
+JUNK = ["box only", "parts only", "untested", "backplate", "shroud", "cooler fan"]
+
+
+@dataclass
+class FakeEbayConfig:
+    """Behaviour of the stand-in server."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    max_entries: int = 250
+    seed: int = 0
+    fixtures_dir: Optional[str] = None
+
+
+@dataclass
+class FakeEbayStats:
+    """Requests the server has answered, by status code."""
+
+    requests: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+    keywords: List[str] = field(default_factory=list)
+
+    def record(self, status, keyword):
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if keyword is not None:
+            self.keywords.append(keyword)
+
+
+def _slug(keyword):
+    return re.sub(r"[^a-z0-9]+", "-", keyword.lower()).strip("-")
+
+
+def load_fixtures(fixtures_dir):
+    """Reads recorded responses, keyed by the slug of the file name."""
+    fixtures = {}
+    for path in sorted(Path(fixtures_dir).glob("*.xml")):
+        fixtures[path.stem] = decode_items(path.read_bytes())
+    return fixtures
+
+
+def expand_keywords(keyword):
+    """Expands an OR query like 'Intel Core (i5-14600K,"i5 14600KF")' into phrases."""
+    match = re.fullmatch(r"(.*?)\s*\((.*)\)", keyword)
+    if match is None:
+        return [keyword]
+    prefix, alternatives = match.groups()
+    return [
+        " ".join(filter(None, [prefix, alternative.strip().strip('"')]))
+        for alternative in alternatives.split(",")
+    ]
+
+
+def _synthetic_total(config, keyword):
+    rng = random.Random(f"{config.seed}:{keyword}:total")
+    total = rng.randint(min(5, config.max_entries), config.max_entries)
+    return total * max(1, len(_product_line(keyword)))
+
+
+@lru_cache(maxsize=None)
+def _product_line(keyword):
+    """Catalog names a broad search like "GeForce RTX" matches, when it names no model."""
+    if re.search(r"\d{3,}", keyword):
+        return ()
+    tokens = title_tokens(keyword)
+    return tuple(name for name in cpus + graphics_cards if tokens <= title_tokens(name))
+
+
+def _synthetic_item(config, keyword, index):
+    rng = random.Random(f"{config.seed}:{keyword}:{index}")
+    # A broad search returns listings for the models of its product line.
+    line = _product_line(keyword)
+    if line:
+        keyword = rng.choice(line)
+    base = 40 + random.Random(f"{config.seed}:{keyword}:base").random() * 1500
+    words = [keyword] + rng.sample(EXTRAS, 2)
+    price = base * rng.uniform(0.8, 1.6)
+    if rng.random() < 0.1:
+        words.append(rng.choice(JUNK))
+        price = base * rng.uniform(0.02, 0.2)
+    rng.shuffle(words)
+    condition_id, condition = rng.choice(CONDITIONS)
+    item_id = 100000000000 + rng.randrange(10**11)
+    return {
+        "item_id": str(item_id),
+        "title": " ".join(words),
+        "url": f"https://www.ebay.com/itm/{_slug(keyword)}-/{item_id}",
+        "price": price,
+        "condition_id": condition_id,
+        "condition": condition,
+    }
+
+
+def _recorded_item(record, index):
+    condition_ids = {name: cid for cid, name in CONDITIONS}
+    condition_id = condition_ids.get(record.condition, "3000")
+    return {
+        "item_id": record.item_id or str(200000000000 + index),
+        "title": record.title,
+        "url": record.url,
+        "price": record.price,
+        "condition_id": condition_id,
+        "condition": record.condition,
+    }
+
+
+def _item_xml(item):
+    return (
+        "<item>"
+        f"<itemId>{item['item_id']}</itemId>"
+        f"<title>{escape(item['title'])}</title>"
+        "<globalId>EBAY-US</globalId>"
+        f"<viewItemURL>{escape(item['url'])}</viewItemURL>"
+        "<sellingStatus>"
+        f'<currentPrice currencyId="USD">{item["price"]:.2f}</currentPrice>'
+        "<sellingState>Active</sellingState>"
+        "</sellingStatus>"
+        "<listingInfo><listingType>FixedPrice</listingType></listingInfo>"
+        "<condition>"
+        f"<conditionId>{item['condition_id']}</conditionId>"
+        f"<conditionDisplayName>{escape(item['condition'])}</conditionDisplayName>"
+        "</condition>"
+        "</item>"
+    )
+
+
+def render_xml(items, page, per_page, total):
+    """Renders a findItemsByKeywords response page."""
+    total_pages = min(MAX_PAGES, math.ceil(total / per_page)) if total else 0
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    body = "".join(_item_xml(item) for item in items)
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?>"
+        f'<findItemsByKeywordsResponse xmlns="{NAMESPACE[1:-1]}">'
+        "<ack>Success</ack><version>1.13.0</version>"
+        f"<timestamp>{timestamp}</timestamp>"
+        f'<searchResult count="{len(items)}">{body}</searchResult>'
+        "<paginationOutput>"
+        f"<pageNumber>{page}</pageNumber>"
+        f"<entriesPerPage>{per_page}</entriesPerPage>"
+        f"<totalPages>{total_pages}</totalPages>"
+        f"<totalEntries>{total}</totalEntries>"
+        "</paginationOutput>"
+        "</findItemsByKeywordsResponse>"
+    )
+
+
+def render_json(items, page, per_page, total):
+    """Renders a findItemsByKeywords response page in the JSON format.
+
+    Like the live service, every value is wrapped in a list.
+    """
+    total_pages = min(MAX_PAGES, math.ceil(total / per_page)) if total else 0
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    response = {
+        "ack": ["Success"],
+        "version": ["1.13.0"],
+        "timestamp": [timestamp],
+        "searchResult": [
+            {
+                "@count": str(len(items)),
+                "item": [
+                    {
+                        "itemId": [item["item_id"]],
+                        "title": [item["title"]],
+                        "globalId": ["EBAY-US"],
+                        "viewItemURL": [item["url"]],
+                        "sellingStatus": [
+                            {
+                                "currentPrice": [
+                                    {"@currencyId": "USD", "__value__": f"{item['price']:.2f}"}
+                                ],
+                                "sellingState": ["Active"],
+                            }
+                        ],
+                        "listingInfo": [{"listingType": ["FixedPrice"]}],
+                        "condition": [
+                            {
+                                "conditionId": [item["condition_id"]],
+                                "conditionDisplayName": [item["condition"]],
+                            }
+                        ],
+                    }
+                    for item in items
+                ],
+            }
+        ],
+        "paginationOutput": [
+            {
+                "pageNumber": [str(page)],
+                "entriesPerPage": [str(per_page)],
+                "totalPages": [str(total_pages)],
+                "totalEntries": [str(total)],
+            }
+        ],
+    }
+    return json.dumps({"findItemsByKeywordsResponse": [response]})
+
+
+def _error_xml(message):
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?>"
+        f'<findItemsByKeywordsResponse xmlns="{NAMESPACE[1:-1]}">'
+        "<ack>Failure</ack>"
+        f"<errorMessage><error><message>{escape(message)}</message></error></errorMessage>"
+        "</findItemsByKeywordsResponse>"
+    )
+
+
+def _int_param(query, name, default, low, high):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        value = default
+    return max(low, min(high, value))
+
+
+def find_items(config, fixtures, keyword, page, per_page):
+    """Returns the items on one page and the total number of matches."""
+    start = (page - 1) * per_page
+    recorded = fixtures.get(_slug(keyword))
+    if recorded is not None:
+        items = [
+            _recorded_item(record, index)
+            for index, record in enumerate(recorded[start : start + per_page], start)
+        ]
+        return items, len(recorded)
+    phrases = expand_keywords(keyword)
+    if len(phrases) == 1:
+        total = _synthetic_total(config, keyword)
+        stop = min(total, start + per_page)
+        return [_synthetic_item(config, keyword, i) for i in range(start, stop)], total
+    # An OR query interleaves the listings each phrase would return on its own.
+    totals = [_synthetic_total(config, phrase) for phrase in phrases]
+    entries = [
+        (phrase, index)
+        for index in range(max(totals))
+        for phrase, total in zip(phrases, totals)
+        if index < total
+    ]
+    page_entries = entries[start : start + per_page]
+    return [_synthetic_item(config, *entry) for entry in page_entries], len(entries)
+
+
+async def handle_finding(request):
+    """Answers a Finding API call."""
+    config = request.app["config"]
+    stats = request.app["stats"]
+    rng = request.app["rng"]
+    query = request.query
+    keyword = query.get("keywords")
+
+    delay = config.latency + (rng.uniform(-config.jitter, config.jitter) if config.jitter else 0)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    roll = rng.random()
+    if roll < config.throttle_rate:
+        stats.record(429, keyword)
+        return web.Response(
+            status=429,
+            headers={"Retry-After": str(config.retry_after)},
+            text=_error_xml("Too many requests"),
+            content_type="text/xml",
+        )
+    if roll < config.throttle_rate + config.error_rate:
+        stats.record(500, keyword)
+        return web.Response(
+            status=500, text=_error_xml("Internal error"), content_type="text/xml"
+        )
+    if query.get("OPERATION-NAME") != "findItemsByKeywords" or not keyword:
+        stats.record(400, keyword)
+        return web.Response(
+            status=400,
+            text=_error_xml("Unsupported operation or missing keywords"),
+            content_type="text/xml",
+        )
+
+    per_page = _int_param(
+        query, "paginationInput.entriesPerPage", 100, 1, MAX_ENTRIES_PER_PAGE
+    )
+    page = _int_param(query, "paginationInput.pageNumber", 1, 1, MAX_PAGES)
+    items, total = find_items(config, request.app["fixtures"], keyword, page, per_page)
+    stats.record(200, keyword)
+    if query.get("RESPONSE-DATA-FORMAT") == "JSON":
+        return web.Response(
+            text=render_json(items, page, per_page, total),
+            content_type="application/json",
+        )
+    return web.Response(
+        text=render_xml(items, page, per_page, total), content_type="text/xml"
+    )
+
+
+def create_app(config=None):
+    """Builds the stand-in server application."""
+    config = config or FakeEbayConfig()
+    app = web.Application()
+    app["config"] = config
+    app["stats"] = FakeEbayStats()
+    app["rng"] = random.Random(config.seed)
+    app["fixtures"] = load_fixtures(config.fixtures_dir) if config.fixtures_dir else {}
+    app.router.add_get(PATH, handle_finding)
+    return app
+
+
+async def start_server(config=None, host="127.0.0.1", port=0):
+    """Starts the server in the running loop and returns (runner, endpoint)."""
+    app = create_app(config)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}{PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local eBay Finding API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of 429s")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--max-entries", type=int, default=250, help="max matches per keyword")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures", help="folder of recorded <keyword-slug>.xml responses")
+    args = parser.parse_args()
+    config = FakeEbayConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        max_entries=args.max_entries,
+        seed=args.seed,
+        fixtures_dir=args.fixtures,
+    )
+    print(f"Serving findItemsByKeywords on http://{args.host}:{args.port}{PATH}")
+    web.run_app(create_app(config), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
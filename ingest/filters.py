@@ -0,0 +1,171 @@
+"""Compiled title filters used to accept or reject eBay listings."""
+
+import re
+from typing import NamedTuple, Optional
+
+MODEL_NUMBER = "model_number"
+SUPERLATIVE = "superlative"
+BANNED_WORD = "banned_word"
+UNMATCHED = "unmatched"
+
+
+class Verdict(NamedTuple):
+    """Outcome of matching one title, with the reason and term on rejection."""
+
+    accepted: bool
+    reason: Optional[str] = None
+    term: Optional[str] = None
+
+
+ACCEPTED = Verdict(True)
+NO_MATCH = Verdict(False, UNMATCHED)
+
+
+def title_tokens(text):
+    """Lowercased alphanumeric tokens of a title or keyword."""
+    return frozenset(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def match_score(keyword_tokens, tokens):
+    """How well a keyword describes a title: its tokens found minus its tokens missing.
+
+    A keyword scores at most len(keyword_tokens), when the title has all of them.
+    """
+    return len(keyword_tokens & tokens) - len(keyword_tokens - tokens)
+
+
+class TitleFilter:
+    """Filter rules for one category, compiled once and shared by its keywords."""
+
+    def __init__(
+        self,
+        banned_words,
+        extract_number=None,
+        extract_superlative=None,
+        component_index=None,
+    ):
+        self._banned_words = {word.lower(): word for word in banned_words}
+        # Longest terms first so "box only" wins over a shorter overlapping term.
+        self._banned = re.compile(
+            "|".join(
+                re.escape(word)
+                for word in sorted(self._banned_words, key=len, reverse=True)
+            )
+        )
+        self._extract_number = extract_number
+        self._extract_superlative = extract_superlative
+        self.component_index = component_index
+
+    def matcher(self, keyword):
+        """Returns the matcher for a searched keyword."""
+        number = self._extract_number(keyword) if self._extract_number else None
+        superlative = (
+            self._extract_superlative(keyword) if self._extract_superlative else None
+        )
+        return KeywordMatcher(self, keyword, number, superlative)
+
+    def request_matcher(self, request):
+        """Returns the matcher for a request, which may cover several keywords."""
+        if request.broad:
+            return IndexMatcher(
+                self, request.keyword, request.members, self.component_index
+            )
+        if request.members:
+            return BatchMatcher(self, request.keyword, request.members)
+        return self.matcher(request.keyword)
+
+    def banned_term(self, normalized):
+        """Returns the configured banned word found in a lowercased title."""
+        match = self._banned.search(normalized)
+        return self._banned_words[match.group(0)] if match else None
+
+
+class KeywordMatcher:
+    """Checks titles against the model number, superlative and banned terms."""
+
+    __slots__ = ("_filter", "keyword", "number", "superlative", "_superlative")
+
+    def __init__(self, title_filter, keyword, number, superlative):
+        self._filter = title_filter
+        self.keyword = keyword
+        self.number = number
+        self.superlative = superlative
+        self._superlative = superlative.lower() if superlative else None
+
+    def __call__(self, title):
+        if self.number and self.number not in title:
+            return Verdict(False, MODEL_NUMBER, self.number)
+        normalized = title.lower()
+        if self._superlative and self._superlative not in normalized:
+            return Verdict(False, SUPERLATIVE, self.superlative)
+        banned = self._filter.banned_term(normalized)
+        if banned is not None:
+            return Verdict(False, BANNED_WORD, banned)
+        return ACCEPTED
+
+    def classify(self, title):
+        """Returns the keyword a title belongs to and the verdict for it."""
+        return self.keyword, self(title)
+
+
+class BatchMatcher:
+    """Attributes titles returned for a combined query to one member keyword.
+
+    A member matches when every token that sets it apart from the other members
+    is in the title. The member with the most such tokens is the most specific
+    one and its own matcher decides the verdict. Titles matching no member are
+    rejected under the combined query.
+    """
+
+    def __init__(self, title_filter, query, members):
+        self.keyword = query
+        token_sets = [title_tokens(member) for member in members]
+        common = frozenset.intersection(*token_sets)
+        self._members = sorted(
+            (
+                (tokens - common, title_filter.matcher(member))
+                for member, tokens in zip(members, token_sets)
+            ),
+            key=lambda member: len(member[0]),
+            reverse=True,
+        )
+
+    def classify(self, title):
+        """Returns the best matching keyword for a title and its verdict."""
+        tokens = title_tokens(title)
+        for distinct, matcher in self._members:
+            if distinct <= tokens:
+                return matcher.keyword, matcher(title)
+        return self.keyword, NO_MATCH
+
+
+class IndexMatcher:
+    """Attributes titles returned for a broad query through a component index.
+
+    The index names the most specific catalog component a title describes;
+    that member's own matcher then decides the verdict. Titles naming no
+    member of the query are rejected under the broad query.
+    """
+
+    def __init__(self, title_filter, query, members, component_index):
+        self.keyword = query
+        self._index = component_index
+        self._members = {member: title_filter.matcher(member) for member in members}
+
+    def classify(self, title):
+        """Returns the component a title describes and its verdict."""
+        matcher = self._members.get(self._index.classify(title))
+        if matcher is None:
+            return self.keyword, NO_MATCH
+        return matcher.keyword, matcher(title)
+
+
+def filter_records(matcher, records, accepted, telemetry):
+    """Adds the records whose titles the matcher accepts to their keyword's list."""
+    for record in records:
+        keyword, verdict = matcher.classify(record.title)
+        if verdict.accepted:
+            accepted[keyword].append(record)
+            telemetry.accept(keyword)
+        else:
+            telemetry.reject(keyword, verdict, record.title)
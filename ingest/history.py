@@ -0,0 +1,249 @@
+"""Append-only SQLite history of accepted listings and selected lowest prices.
+
+Query it from the repository root, e.g.
+
+    python -m ingest.history gpu "GeForce RTX 4070" --days 30
+"""
+
+import argparse
+import datetime
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+TABLES = ("listings", "lowest_prices")
+COLUMNS = "observed_at, category, component, price, title, url, condition, item_id"
+
+# Accepted listings are written to the history in batches of about this many.
+LISTING_BATCH = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    observed_at REAL NOT NULL,
+    category TEXT NOT NULL,
+    component TEXT NOT NULL,
+    price REAL NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    item_id TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS {table}_component_time
+    ON {table} (category, component, observed_at);
+"""
+
+
+class PriceHistory:
+    """Appends observations to a SQLite database and answers range queries over them.
+
+    Rows are only ever inserted, apart from remove_listings() correcting the
+    run that wrote them. Writes share one transaction until commit().
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The website and --merge-shards may hold a lock briefly, so wait it out.
+        # HistoryWriter writes from its own thread, one thread at a time.
+        self.connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        # WAL lets the website read while a refresh is writing.
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        for table in TABLES:
+            self.connection.executescript(_SCHEMA.format(table=table))
+            columns = [
+                row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")
+            ]
+            # Databases created before item IDs were recorded get the column added.
+            if "item_id" not in columns:
+                self.connection.execute(
+                    f"ALTER TABLE {table} ADD COLUMN item_id TEXT NOT NULL DEFAULT ''"
+                )
+        self.pending = 0
+
+    def _insert(self, table, category, listings_by_component, observed_at):
+        rows = [
+            (observed_at, category, component, *listing)
+            for component, listings in listings_by_component.items()
+            for listing in listings
+        ]
+        self.connection.executemany(
+            f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        self.pending += len(rows)
+
+    def add_listings(self, category, listings_by_component, observed_at=None):
+        """Records accepted listings, given as {component: [Listing, ...]}."""
+        observed_at = time.time() if observed_at is None else observed_at
+        self._insert("listings", category, listings_by_component, observed_at)
+
+    def add_lowest(self, category, lowest_prices, observed_at=None):
+        """Records selected lowest prices, given as {component: Listing}."""
+        observed_at = time.time() if observed_at is None else observed_at
+        self._insert(
+            "lowest_prices",
+            category,
+            {component: [listing] for component, listing in lowest_prices.items()},
+            observed_at,
+        )
+
+    def remove_listings(self, listings, since):
+        """Deletes listings recorded since a time, given as (category, component, item_id).
+
+        Returns how many rows were deleted.
+        """
+        cursor = self.connection.executemany(
+            "DELETE FROM listings WHERE category = ? AND component = ? "
+            "AND item_id = ? AND observed_at >= ?",
+            [(*listing, since) for listing in listings],
+        )
+        return cursor.rowcount
+
+    def commit(self):
+        """Writes everything added since the last commit and returns how many rows it was."""
+        self.connection.commit()
+        written, self.pending = self.pending, 0
+        return written
+
+    def merge(self, path):
+        """Appends every row of another history database, e.g. a shard's, and commits.
+
+        Returns how many rows were copied.
+        """
+        self.commit()
+        self.connection.execute("ATTACH DATABASE ? AS other", (str(path),))
+        try:
+            copied = 0
+            for table in TABLES:
+                cursor = self.connection.execute(
+                    f"INSERT INTO main.{table} ({COLUMNS}) "
+                    f"SELECT {COLUMNS} FROM other.{table}"
+                )
+                copied += cursor.rowcount
+            self.connection.commit()
+        finally:
+            self.connection.rollback()
+            self.connection.execute("DETACH DATABASE other")
+        return copied
+
+    def prices(self, category, component, since=None, until=None, table="lowest_prices"):
+        """Rows of one component between since and until (epoch seconds), oldest first."""
+        if table not in TABLES:
+            raise ValueError(f"unknown history table {table!r}")
+        cursor = self.connection.execute(
+            f"SELECT observed_at, price, title, url, condition FROM {table} "
+            "WHERE category = ? AND component = ? AND observed_at BETWEEN ? AND ? "
+            "ORDER BY observed_at",
+            (
+                category,
+                component,
+                0.0 if since is None else since,
+                time.time() if until is None else until,
+            ),
+        )
+        return cursor.fetchall()
+
+    def close(self):
+        self.connection.close()
+
+
+class HistoryWriter:
+    """Records the accepted listings of one refresh in batches while it fetches.
+
+    Listings wait until batch_size of them are queued; the batch is then
+    inserted and committed on a single writer thread. Fetching never waits on
+    SQLite, memory does not grow with the pages a run reads, and whatever was
+    fetched before a crash is already recorded. owns(item_id, owner) drops
+    listings another component has taken over by the time a batch is written.
+    """
+
+    def __init__(self, history, owns, batch_size=LISTING_BATCH):
+        self.history = history
+        self.batch_size = batch_size
+        self.started_at = time.time()
+        self._owns = owns
+        self._batch = []
+        self._queued = 0
+        self._writes = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+
+    def add(self, category, listings_by_component, observed_at=None):
+        """Queues accepted listings, given as {component: [Listing, ...]}."""
+        observed_at = time.time() if observed_at is None else observed_at
+        self._batch.append((category, listings_by_component, observed_at))
+        self._queued += sum(len(listings) for listings in listings_by_component.values())
+        if self._queued >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Hands the queued listings to the writer thread."""
+        if not self._batch:
+            return
+        batch = [
+            (
+                category,
+                {
+                    component: [
+                        listing
+                        for listing in listings
+                        if self._owns(listing.item_id, (category, component))
+                    ]
+                    for component, listings in listings_by_component.items()
+                },
+                observed_at,
+            )
+            for category, listings_by_component, observed_at in self._batch
+        ]
+        self._batch, self._queued = [], 0
+        self._writes.append(self._executor.submit(self._write, batch))
+
+    def _write(self, batch):
+        for category, listings_by_component, observed_at in batch:
+            self.history.add_listings(category, listings_by_component, observed_at)
+        return self.history.commit()
+
+    def finish(self):
+        """Writes what is still queued, waits for every batch and returns the rows written.
+
+        The history's connection is free for other writes afterwards.
+        """
+        self.flush()
+        try:
+            return sum(write.result() for write in self._writes)
+        finally:
+            self._writes = []
+            self._executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shows the price history of one component.")
+    parser.add_argument("category")
+    parser.add_argument("component")
+    parser.add_argument("--days", type=float, default=30, help="how far back to look")
+    parser.add_argument(
+        "--listings",
+        action="store_true",
+        help="show every accepted listing rather than the selected lowest prices",
+    )
+    parser.add_argument("--db", default="Website/CSVs/price_history.sqlite")
+    args = parser.parse_args()
+
+    history = PriceHistory(args.db)
+    rows = history.prices(
+        args.category,
+        args.component,
+        since=time.time() - args.days * 86400,
+        table="listings" if args.listings else "lowest_prices",
+    )
+    history.close()
+    for observed_at, price, title, url, _ in rows:
+        when = datetime.datetime.fromtimestamp(observed_at).strftime("%Y-%m-%d %H:%M")
+        print(f"{when}  {price:>10,.2f}  {title}  {url}")
+    if not rows:
+        print(f"No history for {args.component} in the last {args.days:g} days.")
+
+
+if __name__ == "__main__":
+    main()
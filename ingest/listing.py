@@ -0,0 +1,132 @@
+"""Compact listing records and bounded per-component retention."""
+
+import heapq
+import sys
+
+import numpy as np
+
+
+class Listing:
+    """One eBay listing, with a float price and an interned condition."""
+
+    __slots__ = ("price", "title", "url", "condition", "item_id")
+
+    def __init__(self, price, title, url, condition, item_id=""):
+        self.price = float(price)
+        self.title = title
+        self.url = url
+        self.condition = sys.intern(condition)
+        self.item_id = item_id
+
+    def __iter__(self):
+        yield self.price
+        yield self.title
+        yield self.url
+        yield self.condition
+        yield self.item_id
+
+    def __reduce__(self):
+        # Rebuilding through __init__ re-interns the condition after a pickle round trip.
+        return Listing, tuple(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, Listing):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return "Listing({!r}, {!r}, {!r}, {!r}, {!r})".format(*self)
+
+
+class TopK:
+    """Keeps the k cheapest listings pushed into it, in a bounded max-heap.
+
+    Each retained listing sits in one of k slots, and its price in the same
+    slot of the prices array, so selection reads prices as a column without
+    touching the listings. Empty slots hold None and NaN.
+    """
+
+    __slots__ = ("k", "seen", "prices", "listings", "_heap", "_counter")
+
+    def __init__(self, k):
+        self.k = k
+        self.seen = 0
+        self.prices = np.full(k, np.nan)
+        self.listings = [None] * k
+        self._heap = []
+        self._counter = 0
+
+    def push(self, listing):
+        self.seen += 1
+        self._counter += 1
+        price = listing.price
+        # The counter breaks price ties so slots are never compared.
+        if len(self._heap) < self.k:
+            slot = len(self._heap)
+            heapq.heappush(self._heap, (-price, self._counter, slot))
+        elif price < -self._heap[0][0]:
+            slot = self._heap[0][2]
+            heapq.heapreplace(self._heap, (-price, self._counter, slot))
+        else:
+            return
+        self.prices[slot] = price
+        self.listings[slot] = listing
+
+    def extend(self, listings):
+        for listing in listings:
+            self.push(listing)
+
+    def sorted(self):
+        """The retained listings, cheapest first."""
+        entries = sorted(self._heap, key=lambda entry: (-entry[0], entry[1]))
+        return [self.listings[entry[2]] for entry in entries]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+
+class ItemIndex:
+    """Run-wide record of the component each item ID is attributed to.
+
+    Overlapping searches return the same item more than once. The first
+    component to claim an item keeps it unless a later one matches its title
+    with a higher score, so one listing never prices two components.
+    """
+
+    def __init__(self):
+        self._owners = {}
+        self.duplicates = 0
+        # (item_id, owner) pairs of items taken over by a better-matching owner.
+        self.displaced = []
+
+    def claim(self, item_id, owner, score):
+        """Attributes an item to owner if it is new or owner matches it better."""
+        current = self._owners.get(item_id)
+        if current is not None:
+            self.duplicates += 1
+            if score <= current[1]:
+                return False
+            if current[0] != owner:
+                self.displaced.append((item_id, current[0]))
+        self._owners[item_id] = (owner, score)
+        return True
+
+    def owns(self, item_id, owner):
+        """Whether owner still holds an item, or the item was never indexed."""
+        current = self._owners.get(item_id)
+        return current is None or current[0] == owner
+
+    def skip(self, item_id, best_score):
+        """Whether an item is already held with at least best_score.
+
+        A search whose keywords cannot beat best_score has no use for such an
+        item, so it is counted as a duplicate and can be skipped unfiltered.
+        """
+        current = self._owners.get(item_id)
+        if current is not None and current[1] >= best_score:
+            self.duplicates += 1
+            return True
+        return False
@@ -0,0 +1,196 @@
+"""Prometheus text-format metrics for ingestion runs.
+
+Counters and histograms live for the whole process, so in daemon mode they
+accumulate across cycles the way Prometheus expects. The registry is written
+as a textfile for node_exporter's textfile collector after each run and can be
+served on /metrics.
+"""
+
+from bisect import bisect_left
+
+from ingest.atomic import atomic_write
+
+# Upper bounds, in seconds, of the page request and stage latency buckets.
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named family of samples, one per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}")
+        return tuple(str(value) for value in labels)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, _labels(self.label_names, key), value
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines += [
+            f"{name}{labels} {_number(value)}" for name, labels, value in self.samples()
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count of observations per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect_left(self.buckets, value)] += 1
+        self._values[key] = (counts, total + value)
+
+    def samples(self):
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _labels(self.label_names, key, [("le", _number(bound))]),
+                    cumulative,
+                )
+            labels = _labels(self.label_names, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    """The metrics of one process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "".join(f"{metric.render()}\n" for metric in self.metrics)
+
+    def write_textfile(self, path):
+        """Writes the metrics atomically, so a scrape never reads half a file."""
+        with atomic_write(path) as file:
+            file.write(self.render())
+
+
+class IngestMetrics:
+    """The metrics query.py records while refreshing."""
+
+    def __init__(self, prefix="componenttracking"):
+        self.registry = Registry()
+        register = self.registry.register
+        self.requests = register(Counter(
+            f"{prefix}_requests_total",
+            "Page requests sent to the Finding API, retries included.",
+            ("category",),
+        ))
+        self.responses = register(Counter(
+            f"{prefix}_responses_total",
+            "Responses by HTTP status; status is \"error\" when none arrived.",
+            ("category", "status"),
+        ))
+        self.bytes = register(Counter(
+            f"{prefix}_response_bytes_total",
+            "Response body bytes received.",
+            ("category",),
+        ))
+        self.cached_pages = register(Counter(
+            f"{prefix}_cached_pages_total",
+            "Result pages served from the response cache.",
+            ("category",),
+        ))
+        self.items_parsed = register(Counter(
+            f"{prefix}_items_parsed_total",
+            "Items decoded from fetched responses.",
+            ("category",),
+        ))
+        self.items_accepted = register(Counter(
+            f"{prefix}_items_accepted_total",
+            "Listings accepted by the title filters and kept for a component.",
+            ("category",),
+        ))
+        self.request_seconds = register(Histogram(
+            f"{prefix}_request_seconds",
+            "Time from sending a page request to having its listings filtered.",
+            ("category",),
+        ))
+        self.stage_seconds = register(Histogram(
+            f"{prefix}_stage_seconds",
+            "Duration of the fetch, select and write stages of a refresh.",
+            ("stage",),
+            STAGE_BUCKETS,
+        ))
+        self.runs = register(Counter(
+            f"{prefix}_runs_total", "Refreshes completed."
+        ))
+        self.failures = register(Counter(
+            f"{prefix}_failed_searches_total",
+            "Searches that failed after every attempt.",
+        ))
+        self.cut_short = register(Counter(
+            f"{prefix}_cut_short_searches_total",
+            "Searches cancelled at the run deadline.",
+            ("category",),
+        ))
+        self.last_run = register(Gauge(
+            f"{prefix}_last_run_timestamp_seconds",
+            "Unix time the last refresh finished.",
+        ))
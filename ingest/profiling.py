@@ -0,0 +1,96 @@
+"""cProfile and stack sampling of a run, split into named stages.
+
+Each stage gets its own cProfile profile, written as a .pstats file, and its
+own counts of sampled call stacks, written in the collapsed format that
+flamegraph.pl and speedscope read. Stages can nest; the inner one is profiled
+until it exits and the outer one then resumes.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# Seconds between stack samples.
+SAMPLE_INTERVAL = 0.005
+
+
+def _collapse(frame):
+    """A frame's call stack as "outer;...;inner", one entry per function."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StageProfiler:
+    """Profiles the thread that creates it, one stage at a time.
+
+    cProfile only sees that thread, so with a worker pool the decoding done
+    in the workers is not in the profiles.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.profiles = {}
+        self.stacks = {}
+        self._active = None
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        """Starts sampling stacks in a background thread."""
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._switch(None)
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _switch(self, name):
+        if self._active is not None:
+            self.profiles[self._active].disable()
+        self._active = name
+        if name is not None:
+            self.profiles.setdefault(name, cProfile.Profile()).enable()
+
+    @contextmanager
+    def stage(self, name):
+        """Profiles the block as stage name, then goes back to the enclosing stage."""
+        previous = self._active
+        self._switch(name)
+        try:
+            yield
+        finally:
+            self._switch(previous)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            stage = self._active
+            frame = sys._current_frames().get(self._thread_id)
+            if stage is not None and frame is not None:
+                self.stacks.setdefault(stage, Counter())[_collapse(frame)] += 1
+
+    def write(self, directory):
+        """Writes <stage>.pstats and <stage>.collapsed for every profiled stage."""
+        os.makedirs(directory, exist_ok=True)
+        for stage, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(directory, f"{stage}.pstats"))
+            stacks = self.stacks.get(stage, Counter())
+            path = os.path.join(directory, f"{stage}.collapsed")
+            with open(path, "w", encoding="utf-8") as file:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+
+
+def profiled(profiler, name):
+    """profiler.stage(name), or a no-op when profiling is off."""
+    return profiler.stage(name) if profiler is not None else nullcontext()
@@ -0,0 +1,70 @@
+"""Pre-encoded, immutable requests for the eBay Finding API."""
+
+from dataclasses import dataclass
+from typing import Tuple
+from urllib.parse import quote, urlencode
+
+from yarl import URL
+
+
+@dataclass(frozen=True)
+class FindingRequest:
+    """One keyword search with its fully encoded request URL.
+
+    A batched request searches several catalog keywords at once; keyword is
+    then the combined query and members the keywords it covers. A memory
+    module is searched by a shorter query with its catalog name as member. A broad
+    request searches a whole product line, e.g. "GeForce RTX", and its
+    listings are attributed to members through the category's component index.
+    """
+
+    keyword: str
+    url: URL
+    category: str = ""
+    members: Tuple[str, ...] = ()
+    broad: bool = False
+
+    def page_url(self, page):
+        """The request URL for a results page, counting from 1."""
+        if page == 1:
+            return self.url
+        return URL(f"{self.url}&paginationInput.pageNumber={page}", encoded=True)
+
+    @property
+    def keywords(self):
+        """The catalog keywords this request returns listings for."""
+        return self.members or (self.keyword,)
+
+
+class RequestBuilder:
+    """Encodes the static filter params once and caches a request per keyword."""
+
+    def __init__(self, endpoint, static_params, category="", page_size=None):
+        self.endpoint = endpoint
+        self.category = category
+        if page_size is not None:
+            static_params = {
+                **static_params,
+                "paginationInput.entriesPerPage": page_size,
+            }
+        self._static_query = urlencode(static_params, safe="()", quote_via=quote)
+        self._cache = {}
+
+    def build(self, keyword, members=(), broad=False):
+        """Returns the cached request for a keyword, encoding it on first use."""
+        request = self._cache.get(keyword)
+        if request is None:
+            query = urlencode({"keywords": keyword}, quote_via=quote)
+            request = FindingRequest(
+                keyword,
+                URL(f"{self.endpoint}?{self._static_query}&{query}", encoded=True),
+                self.category,
+                tuple(members),
+                broad,
+            )
+            self._cache[keyword] = request
+        return request
+
+    def build_all(self, keywords):
+        """Builds the requests for a whole catalog."""
+        return [self.build(keyword) for keyword in keywords]
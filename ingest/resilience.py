@@ -0,0 +1,140 @@
+"""Error classification, retry backoff and a circuit breaker for fetches."""
+
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class FetchError(Exception):
+    """A request for a keyword that did not produce a usable response."""
+
+    def __init__(self, keyword, message, status=None):
+        super().__init__(f"{keyword}: {message}")
+        self.keyword = keyword
+        self.status = status
+
+
+class TransientError(FetchError):
+    """Server errors, timeouts and dropped connections, which are worth retrying."""
+
+
+class ThrottledError(TransientError):
+    """A 429 from the API, optionally with the delay it asked for."""
+
+    def __init__(self, keyword, message, status=429, retry_after=None):
+        super().__init__(keyword, message, status)
+        self.retry_after = retry_after
+
+
+class PermanentError(FetchError):
+    """Client errors that will fail the same way if retried."""
+
+
+def parse_retry_after(value):
+    """Returns the Retry-After header as seconds, or None if it is unusable."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def classify_status(keyword, status, headers):
+    """Maps a non-200 status to the matching FetchError."""
+    message = f"status code {status}"
+    if status == 429:
+        return ThrottledError(
+            keyword, message, retry_after=parse_retry_after(headers.get("Retry-After"))
+        )
+    if status >= 500 or status == 408:
+        return TransientError(keyword, message, status)
+    return PermanentError(keyword, message, status)
+
+
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff.
+
+    A 429 is retried after the full Retry-After it asks for. One asking for
+    longer than max_retry_after is not retried, since waiting that long is
+    unlikely to be worth it within one refresh.
+    """
+
+    def __init__(
+        self,
+        max_attempts=4,
+        base_delay=0.5,
+        max_delay=30.0,
+        max_retry_after=300.0,
+        rng=None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self._rng = rng or random.Random()
+
+    def should_retry(self, attempt, error):
+        """Whether a failed attempt (counting from 1) is retried."""
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return False
+        return isinstance(error, TransientError) and attempt < self.max_attempts
+
+    def delay(self, attempt, error):
+        """Seconds to wait before the next attempt, honoring Retry-After in full."""
+        backoff = self._rng.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return retry_after + backoff * 0.1
+        return backoff
+
+
+class CircuitBreaker:
+    """Pauses every request for a cooldown when the recent error rate spikes."""
+
+    def __init__(self, window=20, threshold=0.5, min_calls=10, cooldown=30.0):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self.trips = 0
+
+    @property
+    def is_open(self):
+        return time.monotonic() < self._open_until
+
+    async def wait(self):
+        """Blocks while the breaker is open."""
+        while self.is_open:
+            await asyncio.sleep(self._open_until - time.monotonic())
+
+    def record_success(self):
+        self._outcomes.append(True)
+
+    def record_failure(self):
+        self._outcomes.append(False)
+        if self.is_open or len(self._outcomes) < self.min_calls:
+            return
+        failures = self._outcomes.count(False)
+        if failures / len(self._outcomes) >= self.threshold:
+            self._open_until = time.monotonic() + self.cooldown
+            self._outcomes.clear()
+            self.trips += 1
+            print(
+                f"Circuit open after {failures} recent failures, "
+                f"pausing requests for {self.cooldown:.0f}s."
+            )
@@ -0,0 +1,132 @@
+"""Concurrency and rate limiting for requests sent to the eBay Finding API."""
+
+import asyncio
+import time
+
+import aiohttp
+
+from ingest.resilience import FetchError, TransientError
+
+
+class TokenBucket:
+    """Token bucket that refills at a steady rate up to a burst capacity."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class FetchScheduler:
+    """Runs fetch coroutines with a max in-flight count and a request rate.
+
+    With a retry policy, transient FetchErrors are retried after a backoff that
+    does not hold a slot. With a circuit breaker, every new attempt waits while
+    the breaker is open.
+    """
+
+    def __init__(
+        self,
+        max_in_flight=8,
+        requests_per_second=5.0,
+        limit_per_host=4,
+        retry_policy=None,
+        breaker=None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.limit_per_host = limit_per_host
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._bucket = (
+            TokenBucket(requests_per_second) if requests_per_second > 0 else None
+        )
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+        self.completed = 0
+        self.retries = 0
+        self.started_at = None
+
+    def connector(self, **options):
+        """Builds a connector whose pool matches the scheduler limits."""
+        return aiohttp.TCPConnector(
+            limit=self.max_in_flight, limit_per_host=self.limit_per_host, **options
+        )
+
+    def reset_stats(self):
+        """Starts the completed, retries and throughput counters over."""
+        self.completed = 0
+        self.retries = 0
+        self.started_at = None
+
+    async def _attempt(self, fetch, *args):
+        if self.breaker is not None:
+            await self.breaker.wait()
+        async with self._semaphore:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            return await fetch(*args)
+
+    async def submit(self, fetch, *args):
+        """Runs one fetch once a slot and a rate token are both free."""
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        attempt = 1
+        try:
+            while True:
+                try:
+                    result = await self._attempt(fetch, *args)
+                except FetchError as error:
+                    if self.breaker is not None and isinstance(error, TransientError):
+                        self.breaker.record_failure()
+                    if self.retry_policy is None or not self.retry_policy.should_retry(
+                        attempt, error
+                    ):
+                        raise
+                    self.retries += 1
+                    await asyncio.sleep(self.retry_policy.delay(attempt, error))
+                    attempt += 1
+                else:
+                    if self.breaker is not None:
+                        self.breaker.record_success()
+                    self.completed += 1
+                    return result
+        except asyncio.CancelledError:
+            # A fetch cancelled at the run deadline never completed.
+            raise
+        except BaseException:
+            self.completed += 1
+            raise
+
+    async def map(self, fetch, items, *args):
+        """Schedules fetch(*args, item) for every item and gathers the results.
+
+        Items whose fetch finally fails have their FetchError in place of a result.
+        """
+        return await asyncio.gather(
+            *(self.submit(fetch, *args, item) for item in items), return_exceptions=True
+        )
+
+    def throughput(self):
+        """Completed requests per second since the first submission."""
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.completed / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,111 @@
+"""Robust lowest-price selection over the price columns of TopK retention."""
+
+import numpy as np
+
+# Scale factor that makes the MAD a consistent estimate of the standard deviation.
+MAD_SCALE = 1.4826
+
+# Default fence width for each method, in MADs or interquartile ranges.
+DEFAULT_THRESHOLDS = {"mad": 3.0, "iqr": 1.5}
+
+# The spread of log prices is never taken as less than this, so a component
+# whose listings all share one price still accepts one about 5% cheaper.
+MIN_SPREAD = 0.05
+
+
+class PriceTable:
+    """Retained prices of many components, one row of TopK slots per component.
+
+    Rows are read straight from each TopK's prices array and are not in price
+    order; sorted_logs holds each row's log prices sorted, for quantiles.
+    Empty slots, excluded listings and prices that are not finite and
+    positive get an infinite log price and sort last.
+    """
+
+    def __init__(self, tops, excluded=()):
+        self.components = list(tops)
+        self.tops = list(tops.values())
+        width = max((top.k for top in self.tops), default=0)
+        prices = np.full((len(self.tops), width), np.nan)
+        for row, top in enumerate(self.tops):
+            prices[row, : top.k] = top.prices
+        rows = {component: row for row, component in enumerate(self.components)}
+        for component, item_id in excluded:
+            row = rows.get(component)
+            if row is None:
+                continue
+            for slot, listing in enumerate(self.tops[row].listings):
+                if listing is not None and listing.item_id == item_id:
+                    prices[row, slot] = np.nan
+        valid = np.isfinite(prices) & (prices > 0)
+        self.log_prices = np.full(prices.shape, np.inf)
+        self.log_prices[valid] = np.log(prices[valid])
+        self.sorted_logs = np.sort(self.log_prices, axis=1)
+        self.counts = valid.sum(axis=1)
+
+    def quantile(self, sorted_values, q):
+        """The q-quantile of each row, by linear interpolation.
+
+        sorted_values must be sorted within each row, with its counts[i]
+        valid values first. Rows without valid values get NaN.
+        """
+        quantiles = np.full(len(self.components), np.nan)
+        rows = np.flatnonzero(self.counts)
+        position = q * (self.counts[rows] - 1)
+        lower = np.floor(position).astype(np.intp)
+        upper = np.ceil(position).astype(np.intp)
+        weight = position - lower
+        quantiles[rows] = (
+            sorted_values[rows, lower] * (1 - weight)
+            + sorted_values[rows, upper] * weight
+        )
+        return quantiles
+
+
+class PriceSelector:
+    """Picks the cheapest listing per component that is not a low outlier.
+
+    Statistics are taken over log prices, so fences scale with the price of
+    the part. With the "mad" method a listing is an outlier when it is more
+    than threshold scaled MADs below its component's median. With "iqr" the
+    fence is threshold interquartile ranges below the first quartile.
+    """
+
+    def __init__(self, method="mad", threshold=None):
+        if method not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"unknown outlier method {method!r}")
+        self.method = method
+        self.threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+
+    def fences(self, table):
+        """The lowest accepted log price of each component."""
+        if self.method == "mad":
+            centre = table.quantile(table.sorted_logs, 0.5)
+            deviations = np.sort(np.abs(table.log_prices - centre[:, None]), axis=1)
+            spread = MAD_SCALE * table.quantile(deviations, 0.5)
+        else:
+            centre = table.quantile(table.sorted_logs, 0.25)
+            spread = table.quantile(table.sorted_logs, 0.75) - centre
+        spread = np.maximum(spread, MIN_SPREAD)
+        return centre - self.threshold * spread
+
+    def select(self, tops, excluded=()):
+        """Returns {component: listing} with the cheapest accepted listing of each.
+
+        tops maps components to their TopK; excluded holds (component,
+        item_id) pairs of retained listings to leave out.
+        """
+        table = PriceTable(tops, excluded)
+        if not table.counts.any():
+            return {}
+        fences = self.fences(table)
+        # Rejected slots are priced out, so each row's minimum is its cheapest
+        # accepted listing. Rows whose minimum is infinite accepted none.
+        candidates = np.where(
+            table.log_prices >= fences[:, None], table.log_prices, np.inf
+        )
+        slots = candidates.argmin(axis=1)
+        rows = np.flatnonzero(np.isfinite(candidates[np.arange(len(slots)), slots]))
+        return {
+            table.components[row]: table.tops[row].listings[slots[row]] for row in rows
+        }
@@ -0,0 +1,89 @@
+"""Stable partitioning of a refresh into shards, and the partial results they write.
+
+Each shard refreshes the requests whose category and keyword hash to it and
+writes its lowest prices to a partial file of its own. A merge then writes
+the partials into the category CSVs, so shards never share an output file.
+"""
+
+import argparse
+import json
+import os
+import time
+import zlib
+from typing import NamedTuple
+
+from ingest.atomic import atomic_write
+
+
+class Shard(NamedTuple):
+    """Shard index of count, counting from 1."""
+
+    index: int
+    count: int
+
+    @property
+    def label(self):
+        return f"{self.index}-of-{self.count}"
+
+    def owns(self, request):
+        """Whether a request belongs to this shard."""
+        return shard_number(request.category, request.keyword, self.count) == self.index
+
+
+def parse_shard(text):
+    """Parses "i/N" into a Shard, for use as an argparse type."""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}") from None
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}")
+    return Shard(index, count)
+
+
+def shard_number(category, keyword, count):
+    """The shard a keyword belongs to. CRC-32 is stable across processes, unlike hash()."""
+    return zlib.crc32(f"{category}/{keyword}".encode("utf-8")) % count + 1
+
+
+def shard_filename(path, shard):
+    """Inserts the shard label before the extension, e.g. gpu.json -> gpu.2-of-4.json."""
+    base, extension = os.path.splitext(path)
+    return f"{base}.{shard.label}{extension}"
+
+
+def write_partial(path, lowest_prices, refreshed, freshness):
+    """Writes one shard's lowest prices and refreshed components for one category.
+
+    refreshed maps every component the shard fetched to its new lowest price,
+    or None when no listing qualified, and freshness every component it
+    planned to fetch to its freshness flag.
+    """
+    partial = {
+        "written_at": time.time(),
+        "lowest_prices": {
+            name: list(listing) for name, listing in lowest_prices.items()
+        },
+        "refreshed": refreshed,
+        "freshness": freshness,
+    }
+    with atomic_write(path) as file:
+        json.dump(partial, file)
+
+
+def read_partials(path, count):
+    """Reads the partials of all count shards for one category.
+
+    Returns {shard path: partial} for those present and the labels of the
+    missing ones.
+    """
+    partials = {}
+    missing = []
+    for index in range(1, count + 1):
+        shard_path = shard_filename(path, Shard(index, count))
+        try:
+            with open(shard_path, encoding="utf-8") as file:
+                partials[shard_path] = json.load(file)
+        except FileNotFoundError:
+            missing.append(Shard(index, count).label)
+    return partials, missing
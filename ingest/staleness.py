@@ -0,0 +1,68 @@
+"""Per-component refresh timestamps and price volatility for incremental runs."""
+
+import json
+import math
+import time
+
+from ingest.atomic import atomic_write
+
+# Stable components still come due eventually, after budget / floor hours.
+VOLATILITY_FLOOR = 0.01
+# Weight of the newest price change in the volatility average.
+VOLATILITY_ALPHA = 0.3
+
+
+class RefreshState:
+    """Tracks when each component was last refreshed and how much its price moves.
+
+    Volatility is an exponentially weighted average of the absolute log change
+    between consecutive prices. A component is due for a refresh once the hours
+    since its last refresh times its volatility reach the budget.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as file:
+                self._state = json.load(file)
+        except FileNotFoundError:
+            self._state = {}
+
+    def entry(self, category, name):
+        return self._state.get(category, {}).get(name)
+
+    def score(self, category, name, now=None):
+        """Staleness in hours times volatility; infinite if never refreshed."""
+        entry = self.entry(category, name)
+        if entry is None:
+            return math.inf
+        now = time.time() if now is None else now
+        hours = max(0.0, now - entry["refreshed_at"]) / 3600
+        return hours * max(entry.get("volatility", 0.0), VOLATILITY_FLOOR)
+
+    def due(self, category, names, budget, now=None):
+        """Returns the names whose score reaches the budget, highest score first."""
+        now = time.time() if now is None else now
+        scored = [(self.score(category, name, now), name) for name in names]
+        return [name for score, name in sorted(scored, reverse=True) if score >= budget]
+
+    def update(self, category, name, price=None, now=None):
+        """Records a refresh, folding a new price into the volatility average."""
+        now = time.time() if now is None else now
+        entry = self._state.setdefault(category, {}).setdefault(
+            name, {"volatility": 0.0}
+        )
+        previous = entry.get("price")
+        if price is not None and 0 < price < math.inf:
+            if previous:
+                change = abs(math.log(price / previous))
+                entry["volatility"] = (
+                    VOLATILITY_ALPHA * change
+                    + (1 - VOLATILITY_ALPHA) * entry["volatility"]
+                )
+            entry["price"] = price
+        entry["refreshed_at"] = now
+
+    def save(self):
+        with atomic_write(self.path) as file:
+            json.dump(self._state, file, indent=2, sort_keys=True)
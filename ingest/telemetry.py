@@ -0,0 +1,99 @@
+"""Counters and sampled rejections for the title filters."""
+
+import json
+import os
+import random
+from collections import Counter
+
+
+class FilterTelemetry:
+    """Counts verdicts per keyword and reason, and keeps a sample of rejected titles.
+
+    Each rejection reason has a reservoir of at most sample_size titles, so
+    every rejected title has the same chance of being kept however many
+    listings a run sees.
+    """
+
+    def __init__(self, sample_size=20, rng=None):
+        self.sample_size = sample_size
+        self.accepted = Counter()
+        self.rejected = Counter()
+        self._samples = {}
+        self._seen = Counter()
+        self._rng = rng or random.Random()
+
+    def accept(self, keyword):
+        self.accepted[keyword] += 1
+
+    def reject(self, keyword, verdict, title):
+        reason = verdict.reason
+        self.rejected[keyword, reason] += 1
+        self._seen[reason] += 1
+        sample = self._samples.setdefault(reason, [])
+        if len(sample) < self.sample_size:
+            sample.append((keyword, title, verdict.term))
+            return
+        slot = self._rng.randrange(self._seen[reason])
+        if slot < self.sample_size:
+            sample[slot] = (keyword, title, verdict.term)
+
+    def by_reason(self):
+        totals = Counter()
+        for (_, reason), count in self.rejected.items():
+            totals[reason] += count
+        return totals
+
+    def summary(self):
+        """The counters and samples as a JSON-serializable dict."""
+        by_keyword = {}
+        for keyword, count in self.accepted.items():
+            by_keyword.setdefault(keyword, {})["accepted"] = count
+        for (keyword, reason), count in self.rejected.items():
+            by_keyword.setdefault(keyword, {})[reason] = count
+        return {
+            "accepted": sum(self.accepted.values()),
+            "rejected": sum(self.rejected.values()),
+            "by_reason": dict(self.by_reason()),
+            "by_keyword": dict(sorted(by_keyword.items())),
+            "samples": {
+                reason: [
+                    {"keyword": keyword, "title": title, "term": term}
+                    for keyword, title, term in sample
+                ]
+                for reason, sample in self._samples.items()
+            },
+        }
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+
+
+class FilterEvents:
+    """Records verdicts in a worker so they can be replayed into FilterTelemetry.
+
+    Only plain values are kept, so a batch of events can be sent back from a
+    process pool. Events are kept in the order the records were filtered.
+    """
+
+    __slots__ = ("events",)
+
+    def __init__(self):
+        self.events = []
+
+    def accept(self, keyword):
+        self.events.append((keyword, None, None))
+
+    def reject(self, keyword, verdict, title):
+        self.events.append((keyword, verdict, title))
+
+    def replay(self, telemetry, skipped=()):
+        """Replays every event except those at the positions in skipped."""
+        for position, (keyword, verdict, title) in enumerate(self.events):
+            if position in skipped:
+                continue
+            if verdict is None:
+                telemetry.accept(keyword)
+            else:
+                telemetry.reject(keyword, verdict, title)
@@ -0,0 +1,192 @@
+"""Per-request timing of Finding API calls through aiohttp's TraceConfig hooks.
+
+aiohttp reports when a request waits for a pooled connection, resolves DNS,
+opens a connection, has sent its headers and has received the response
+headers. fetch_page adds when the body was fully read and how long decoding
+and filtering took, which aiohttp cannot see while the body is streamed.
+"""
+
+import csv
+import os
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import aiohttp
+
+# Phases of a request, in the order they happen.
+PHASES = ("queued", "dns", "connect", "ttfb", "transfer", "parse", "total")
+PERCENTILES = (50, 90, 99)
+
+
+class RequestTiming:
+    """Timestamps (perf_counter seconds) and durations of one page request."""
+
+    __slots__ = (
+        "category",
+        "keyword",
+        "page",
+        "status",
+        "started",
+        "queued",
+        "dns",
+        "connect",
+        "headers_sent",
+        "headers_received",
+        "body_received",
+        "parse",
+    )
+
+    def __init__(self, category, keyword, page):
+        self.category = category
+        self.keyword = keyword
+        self.page = page
+        self.status = None
+        self.started = time.perf_counter()
+        # A reused connection skips queueing, DNS and connecting entirely.
+        self.queued = self.dns = self.connect = 0.0
+        self.headers_sent = self.headers_received = self.body_received = None
+        self.parse = 0.0
+
+    def phases(self):
+        """Seconds spent in each phase; phases the request never reached are 0."""
+        sent = self.headers_sent or self.started
+        received = self.headers_received or sent
+        body = self.body_received or received
+        return {
+            "queued": self.queued,
+            "dns": self.dns,
+            "connect": max(0.0, self.connect - self.dns),
+            "ttfb": received - sent,
+            "transfer": max(0.0, body - received - self.parse),
+            "parse": self.parse,
+            "total": body - self.started,
+        }
+
+
+def percentile(sorted_values, q):
+    """The q-th percentile of sorted values, by the nearest-rank method."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-q * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+class RequestTracer:
+    """Collects a RequestTiming for every page request of a refresh."""
+
+    def __init__(self):
+        self.timings = []
+
+    def start(self, category, keyword, page):
+        """A timing to pass to session.get as trace_request_ctx."""
+        return RequestTiming(category, keyword, page)
+
+    def record(self, timing):
+        self.timings.append(timing)
+
+    def reset(self):
+        self.timings = []
+
+    def trace_config(self):
+        """A TraceConfig that fills in the RequestTiming of each traced request."""
+        config = aiohttp.TraceConfig(trace_config_ctx_factory=SimpleNamespace)
+
+        async def on_queued_start(session, context, params):
+            context.queued_at = time.perf_counter()
+
+        async def on_queued_end(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.queued += time.perf_counter() - context.queued_at
+
+        async def on_dns_start(session, context, params):
+            context.dns_at = time.perf_counter()
+
+        async def on_dns_end(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.dns += time.perf_counter() - context.dns_at
+
+        async def on_connect_start(session, context, params):
+            context.connect_at = time.perf_counter()
+
+        async def on_connect_end(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.connect += (
+                    time.perf_counter() - context.connect_at
+                )
+
+        async def on_headers_sent(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.headers_sent = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.headers_received = time.perf_counter()
+                context.trace_request_ctx.status = params.response.status
+
+        config.on_connection_queued_start.append(on_queued_start)
+        config.on_connection_queued_end.append(on_queued_end)
+        config.on_dns_resolvehost_start.append(on_dns_start)
+        config.on_dns_resolvehost_end.append(on_dns_end)
+        config.on_connection_create_start.append(on_connect_start)
+        config.on_connection_create_end.append(on_connect_end)
+        config.on_request_headers_sent.append(on_headers_sent)
+        config.on_request_end.append(on_request_end)
+        return config
+
+    def summary(self):
+        """{phase: {"p50": ..., "p90": ..., "p99": ..., "max": ...}} in seconds."""
+        by_phase = defaultdict(list)
+        for timing in self.timings:
+            for phase, seconds in timing.phases().items():
+                by_phase[phase].append(seconds)
+        summary = {}
+        for phase in PHASES:
+            values = sorted(by_phase[phase])
+            summary[phase] = {f"p{q}": percentile(values, q) for q in PERCENTILES}
+            summary[phase]["max"] = values[-1] if values else 0.0
+        return summary
+
+    def keyword_table(self):
+        """One row per keyword with its pages and summed phase times, slowest first."""
+        rows = {}
+        for timing in self.timings:
+            row = rows.setdefault(
+                (timing.category, timing.keyword),
+                {
+                    "category": timing.category,
+                    "keyword": timing.keyword,
+                    "pages": 0,
+                    **dict.fromkeys(PHASES, 0.0),
+                    "slowest_page": 0.0,
+                },
+            )
+            row["pages"] += 1
+            phases = timing.phases()
+            for phase in PHASES:
+                row[phase] += phases[phase]
+            row["slowest_page"] = max(row["slowest_page"], phases["total"])
+        return sorted(rows.values(), key=lambda row: row["total"], reverse=True)
+
+    def write_table(self, path):
+        """Writes the per-keyword table as CSV, in milliseconds."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fieldnames = ["category", "keyword", "pages", *PHASES, "slowest_page"]
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in self.keyword_table():
+                writer.writerow(
+                    {
+                        name: f"{value * 1000:.1f}" if isinstance(value, float) else value
+                        for name, value in row.items()
+                    }
+                )
+
+    def print_summary(self):
+        columns = [f"p{q}" for q in PERCENTILES] + ["max"]
+        print(f"Request timing over {len(self.timings)} requests (ms):")
+        print(f"  {'phase':<10}" + "".join(f"{name:>10}" for name in columns))
+        for phase, stats in self.summary().items():
+            values = "".join(f"{seconds * 1000:>10.1f}" for seconds in stats.values())
+            print(f"  {phase:<10}{values}")
@@ -0,0 +1,88 @@
+"""Decoding and filtering of response bodies off the event loop thread."""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple
+
+from ingest.decode import DECODERS
+from ingest.filters import filter_records
+from ingest.listing import Listing
+from ingest.telemetry import FilterEvents
+
+POOLS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+
+class DecodedPage(NamedTuple):
+    results: Dict[str, List[Listing]]
+    records: List[Listing]
+    found_search_result: bool
+    total_pages: int
+    events: FilterEvents
+    parsed: int
+    # The item ID of each decoded record, in the order events were recorded.
+    item_ids: List[str]
+
+
+# What pool workers decode pages for, set once per worker by init_worker so
+# pages only carry the key of their request.
+_TITLE_FILTERS = {}
+_REQUESTS = {}
+_MATCHERS = {}
+
+
+def request_key(request):
+    return request.category, request.keyword
+
+
+def init_worker(title_filters, requests):
+    """Pool initializer: keeps {category: TitleFilter} and {request_key: request}."""
+    _TITLE_FILTERS.update(title_filters)
+    _REQUESTS.update(requests)
+
+
+def make_executor(pool, workers, title_filters, requests):
+    """A thread or process pool whose workers can decode pages of the given requests.
+
+    The title filters, including any component index, and the requests are
+    sent to each worker once, rather than pickled with every page.
+    """
+    by_key = {request_key(request): request for request in requests}
+    return POOLS[pool](
+        max_workers=workers, initializer=init_worker, initargs=(title_filters, by_key)
+    )
+
+
+def _matcher(key):
+    matcher = _MATCHERS.get(key)
+    if matcher is None:
+        request = _REQUESTS[key]
+        matcher = _TITLE_FILTERS[request.category].request_matcher(request)
+        _MATCHERS[key] = matcher
+    return matcher
+
+
+def decode_page(body, key, response_format, keep_records):
+    """Decodes a whole response body and filters its items for the request at key.
+
+    Runs in a pool worker, so everything it takes and returns is picklable.
+    Telemetry comes back as FilterEvents for the loop to replay, and the
+    decoded records only when keep_records is set (they are only needed for
+    the response cache). Every record is filtered; the loop drops settled
+    items afterwards by their item_ids, since the item index lives there.
+    """
+    matcher = _matcher(key)
+    keywords = _REQUESTS[key].keywords
+    decoder = DECODERS[response_format]()
+    records = list(decoder.feed(body))
+    records.extend(decoder.close())
+    results = {keyword: [] for keyword in keywords}
+    events = FilterEvents()
+    filter_records(matcher, records, results, events)
+    return DecodedPage(
+        results,
+        records if keep_records else [],
+        decoder.found_search_result,
+        decoder.total_pages,
+        events,
+        len(records),
+        [record.item_id for record in records],
+    )
@@ -1,59 +1,151 @@
-import xml.etree.ElementTree as ET
+import argparse
 import csv
 import asyncio
+import os
+import signal
+import time
+import traceback
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
-from typing import List, Dict
+from types import MappingProxyType
+from typing import List, Dict, Optional, Set
 import aiohttp
-import re
-from datetime import datetime
-from dataBase.gpu import graphics_cards as card_names
-from dataBase.cpu import cpus
+from ingest.cache import ResponseCache
+from ingest.categories import CATEGORIES, DEFAULT_CATEGORIES, Category
+from ingest.components import ComponentIndex
+from ingest.daemon import RefreshDaemon, start_status_server
+from ingest.deadline import (
+    CACHED,
+    FRESH,
+    PARTIAL,
+    STALE,
+    RunDeadline,
+    parse_shares,
+    update_freshness,
+)
+from ingest.decode import DECODE_ERRORS, DECODERS
+from ingest.batching import plan_broad_requests, plan_requests, plan_search_requests
+from ingest.atomic import atomic_write
+from ingest.filters import TitleFilter, filter_records, match_score, title_tokens
+from ingest.history import HistoryWriter, PriceHistory
+from ingest.listing import ItemIndex, Listing, TopK
+from ingest.metrics import IngestMetrics
+from ingest.profiling import StageProfiler, profiled
+from ingest.resilience import (
+    CircuitBreaker,
+    FetchError,
+    PermanentError,
+    RetryPolicy,
+    TransientError,
+    classify_status,
+)
+from ingest.request import FindingRequest, RequestBuilder
+from ingest.scheduler import FetchScheduler
+from ingest.selection import DEFAULT_THRESHOLDS, PriceSelector
+from ingest.shards import (
+    Shard,
+    parse_shard,
+    read_partials,
+    shard_filename,
+    write_partial,
+)
+from ingest.staleness import RefreshState
+from ingest.telemetry import FilterTelemetry
+from ingest.tracing import RequestTracer
+from ingest.workers import POOLS, decode_page, make_executor, request_key
 
 APP_ID = "WillLaue-Finding-PRD-ac1cfea6d-bbddde16"
-ENDPOINT = "https://svcs.ebay.com/services/search/FindingService/v1"
-
-SEARCHGPUS = False
-SEARCHCPUS = True
-
-banned_words = [
-    "shroud",
-    "cable",
-    "bracket",
-    "empty",
-    "shield",
-    "kit",
-    "powerlink",
-    "bios",
-    "block",
-    "backplate",
-    "back plate",
-    "box-only",
-    "mining",
-    "cooling fan",
-    "graphics card fan",
-    "cooler fan",
-    "box only",
-    "only fan",
-    "parts only",
-    "no gpu",
-    "heatsink",
-    "heat sink",
-    "untested",
-    "1700 Cooler",
-    " es ",
-    "box only",
-    "confidential",
-    "merch",
-    "nvlink",
-    "connector"
-]
-
-params = {
+# EBAY_ENDPOINT points runs at another server, e.g. the local stand-in in ingest/fake_ebay.py.
+ENDPOINT = os.environ.get(
+    "EBAY_ENDPOINT", "https://svcs.ebay.com/services/search/FindingService/v1"
+)
+
+# Keeps a full catalog refresh at a steady rate instead of one big burst.
+MAX_IN_FLIGHT = 8
+REQUESTS_PER_SECOND = 5.0
+LIMIT_PER_HOST = 4
+
+# Failed requests are retried with backoff; a spike of failures pauses all requests.
+MAX_ATTEMPTS = 4
+# 429s asking to wait longer than this many seconds are not retried.
+MAX_RETRY_AFTER = 300
+REQUEST_TIMEOUT = 30
+BREAKER_THRESHOLD = 0.5
+BREAKER_COOLDOWN = 30.0
+
+# Incremental runs only refresh components whose hours since the last refresh
+# times price volatility reach this budget.
+REFRESH_STATE = "Website/CSVs/refresh_state.json"
+REFRESH_BUDGET = 1.0
+
+# Responses are requested and decoded in this RESPONSE-DATA-FORMAT (XML or JSON).
+RESPONSE_FORMAT = "XML"
+
+# Searches are read page by page until each keyword has enough accepted
+# listings for a confident lowest price, or the page limit is reached.
+PAGE_SIZE = 100
+MAX_PAGES = 3
+MIN_CANDIDATES = 25
+
+# Filter counters and sampled rejected titles are written here after each run.
+FILTER_STATS = "logs/filter_stats.json"
+FILTER_SAMPLE_SIZE = 20
+
+# Prometheus textfile with the counters and latency histograms of each run.
+METRICS_FILE = "logs/metrics.prom"
+
+# Per-keyword request timing table written with --trace.
+TRACE_FILE = "logs/request_timings.csv"
+
+# --profile writes one folder of per-stage profiles per refresh here.
+PROFILE_DIR = "logs/profiles"
+
+# Every accepted listing and selected lowest price is appended here.
+HISTORY_DB = "Website/CSVs/price_history.sqlite"
+
+# Sharded runs write their partial results here, one file per category and shard.
+SHARD_DIR = "Website/CSVs/shards"
+
+# Share of --deadline given to the fetch, select and write stages, and where
+# the freshness of each refreshed component is written.
+STAGE_SHARES = "0.8,0.1,0.1"
+FRESHNESS = "Website/CSVs/freshness.json"
+
+# Only the cheapest listings of each component are kept for price selection.
+TOP_K = 100
+
+# Listings this far below their component's typical price are treated as junk.
+# "mad" fences at median - threshold * MAD, "iqr" at Q1 - threshold * IQR.
+OUTLIER_METHOD = "mad"
+
+# Batched runs search up to this many related keywords in one OR query.
+BATCH_SIZE = 4
+
+# Daemon mode keeps one session alive and refreshes on a schedule.
+DAEMON_INTERVAL = 60 * 60
+# Cached pages in daemon mode expire after this share of --interval, so every
+# cycle refetches what it needs. A page fetched late in one cycle can be read
+# early in the next, less than a full interval later.
+DAEMON_CACHE_SHARE = 0.5
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 10 * 60
+STATUS_HOST = "127.0.0.1"
+
+# Bytes read from the response at a time by the streaming decoder.
+CHUNK_SIZE = 16 * 1024
+
+# Decoded responses are reused until they are older than their category's TTL.
+CACHE_DIR = ".cache/responses"
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Shared by every request, so it is read-only. The keyword is added per request
+# by the RequestBuilder.
+params = MappingProxyType({
     "OPERATION-NAME": "findItemsByKeywords",
     "SERVICE-VERSION": "1.0.0",
     "SECURITY-APPNAME": APP_ID,
-    "RESPONSE-DATA-FORMAT": "XML",
-    "paginationInput.entriesPerPage": 100,
+    "RESPONSE-DATA-FORMAT": RESPONSE_FORMAT,
+    "paginationInput.entriesPerPage": PAGE_SIZE,
     "sortOrder": "BestMatch",
     "itemFilter(0).name": "ListingType",
     "itemFilter(0).value": "FixedPrice",
@@ -64,99 +156,325 @@ params = {
     "itemFilter(1).value(3)": "4000",
     "itemFilter(1).value(4)": "5000",
     "itemFilter(1).value(5)": "6000",
-}
-
-def extract_number(keyword):
-    """Extracts the important 4-digit or 5-digit CPU number from the keyword."""
-    if(SEARCHCPUS):
-        match = re.search(r'\d{4,5}', keyword)
-        return match.group(0) if match else None
-    
-def extract_superlative(keyword):
-    """Extracts the important keyword 'TI', 'SUPER', or 'TI SUPER' from the input string."""
-    if 'TI SUPER' in keyword.upper():
-        return 'TI SUPER'
-    elif 'TI' in keyword.upper():
-        return 'TI'
-    elif 'SUPER' in keyword.upper():
-        return 'SUPER'
-    else:
-        return None
-
-async def fetch_data(session, keyword):
-    """Async method to fetch info about cards or cpus quickly."""
-    params["keywords"] = keyword
-    async with session.get(ENDPOINT, params=params) as response:
-        if response.status != 200:
-            print(f"Request failed with status code {response.status} for {keyword}.")
-            return keyword, []
-        content = await response.text()
-        root = ET.fromstring(content)
-        ns = {"ns": "http://www.ebay.com/marketplace/search/v1/services"}
-        search_result = root.find(".//ns:searchResult", namespaces=ns)
-        if search_result is not None:
-            items = search_result.findall("ns:item", namespaces=ns)
-            results = []
-            keyword_number = extract_number(keyword)  # Get the 4-digit CPU number (e.g., 5900, 9100, 7600)
-            superlative = extract_superlative(keyword) # Get the superlative (e.g., TI, SUPER)
-            for item in items:
-                title = (
-                    item.find("ns:title", namespaces=ns).text
-                    if item.find("ns:title", namespaces=ns) is not None
-                    else "N/A"
-                )
-                if keyword_number and keyword_number not in title:
-                    print(f"Filtered out item with title: {title} (keyword number '{keyword_number}' not in title)")
-                    continue
-                if superlative and superlative not in title.upper():
-                    print(f"Filtered out item with title: {title} (superlative '{superlative}' not in title)")
-                    continue
-                if(SEARCHGPUS and not superlative):
-                    if 'TI SUPER' in title.upper() or 'TI' in title.upper() or 'SUPER' in title.upper():
-                        print(f"Filtered out item with title: {title} unwanted superlative found")
-                for banned_word in banned_words:
-                    if banned_word.lower() in title.lower():
-                        print(f"Filtered out item with title: {title} (banned word '{banned_word}')")
-                        break
-                else:
-                    price = (
-                        float(
-                            item.find(".//ns:currentPrice", namespaces=ns).text.replace(
-                                ",", ""
-                            )
-                        )
-                        if item.find(".//ns:currentPrice", namespaces=ns) is not None
-                        else float("inf")
-                    )
-                    url = (
-                        item.find("ns:viewItemURL", namespaces=ns).text
-                        if item.find("ns:viewItemURL", namespaces=ns) is not None
-                        else "N/A"
-                    )
-                    condition = (
-                        item.find("ns:conditionDisplayName", namespaces=ns).text
-                        if item.find("ns:conditionDisplayName", namespaces=ns) is not None
-                        else "N/A"
-                    )
-                    results.append((price, title, url, condition))
-            return keyword, results
+})
+
+@dataclass
+class FetchContext:
+    """Run-wide state shared by every fetch in one refresh."""
+    scheduler: FetchScheduler
+    session: aiohttp.ClientSession
+    infos: Dict[str, "GeneralInfo"]
+    cache: Optional[ResponseCache] = None
+    history: Optional[HistoryWriter] = None
+    executor: Optional[Executor] = None
+    response_format: str = RESPONSE_FORMAT
+    telemetry: FilterTelemetry = field(default_factory=FilterTelemetry)
+    max_pages: int = MAX_PAGES
+    min_candidates: int = MIN_CANDIDATES
+    index: ItemIndex = field(default_factory=ItemIndex)
+    progress: Dict[FindingRequest, Dict[str, TopK]] = field(default_factory=dict)
+    metrics: IngestMetrics = field(default_factory=IngestMetrics)
+    tracer: Optional[RequestTracer] = None
+    profiler: Optional[StageProfiler] = None
+    # Searches that had any page served from the response cache.
+    cached: Set[FindingRequest] = field(default_factory=set)
+
+def drop_settled(context, request, records):
+    """Drops records whose item no keyword of the request could claim any more.
+
+    They skip title filtering entirely. Records are still decoded, since the
+    cache keeps every item of a page.
+    """
+    best_score = max(len(title_tokens(keyword)) for keyword in request.keywords)
+    return [
+        record
+        for record in records
+        if not (record.item_id and context.index.skip(record.item_id, best_score))
+    ]
+
+def drop_settled_decoded(context, request, decoded_page):
+    """Applies drop_settled to a page a pool worker has already filtered.
+
+    The settled items' telemetry events and accepted listings are discarded,
+    so counts match filtering on the loop. Returns the accepted listings.
+    """
+    best_score = max(len(title_tokens(keyword)) for keyword in request.keywords)
+    skipped = {
+        position
+        for position, item_id in enumerate(decoded_page.item_ids)
+        if item_id and context.index.skip(item_id, best_score)
+    }
+    decoded_page.events.replay(context.telemetry, skipped)
+    if not skipped:
+        return decoded_page.results
+    settled = {decoded_page.item_ids[position] for position in skipped}
+    return {
+        keyword: [listing for listing in listings if listing.item_id not in settled]
+        for keyword, listings in decoded_page.results.items()
+    }
+
+def claim_listings(context, request, results):
+    """Keeps only the listings that each keyword is now the best match for."""
+    for keyword, listings in results.items():
+        owner = (request.category, keyword)
+        keyword_tokens = title_tokens(keyword)
+        results[keyword] = [
+            listing
+            for listing in listings
+            if not listing.item_id
+            or context.index.claim(
+                listing.item_id,
+                owner,
+                match_score(keyword_tokens, title_tokens(listing.title)),
+            )
+        ]
+    return results
+
+async def fetch_page(context, matcher, request, page):
+    """Fetches one page of a search.
+
+    Returns the accepted listings for each keyword the request covers and the
+    number of pages the search has.
+    """
+    keyword = request.keyword
+    category = request.category
+    metrics = context.metrics
+    url = request.page_url(page)
+    results = {member: [] for member in request.keywords}
+    started = time.perf_counter()
+    metrics.requests.inc(category)
+    status = "error"
+    timing = (
+        context.tracer.start(category, keyword, page)
+        if context.tracer is not None
+        else None
+    )
+    parse_seconds = 0.0
+    try:
+        async with context.session.get(url, trace_request_ctx=timing) as response:
+            status = response.status
+            metrics.responses.inc(category, status)
+            if response.status != 200:
+                raise classify_status(keyword, response.status, response.headers)
+            if context.executor is not None:
+                body = await response.read()
+                metrics.bytes.inc(category, amount=len(body))
+            else:
+                decoder = DECODERS[context.response_format]()
+                decoded = []
+                # Items are filtered as soon as they close, while the rest of the body is still arriving.
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    metrics.bytes.inc(category, amount=len(chunk))
+                    parse_started = time.perf_counter()
+                    with profiled(context.profiler, "parse"):
+                        records = list(decoder.feed(chunk))
+                        decoded.extend(records)
+                        records = drop_settled(context, request, records)
+                        filter_records(matcher, records, results, context.telemetry)
+                    parse_seconds += time.perf_counter() - parse_started
+                parse_started = time.perf_counter()
+                with profiled(context.profiler, "parse"):
+                    records = list(decoder.close())
+                    decoded.extend(records)
+                    records = drop_settled(context, request, records)
+                    filter_records(matcher, records, results, context.telemetry)
+                parse_seconds += time.perf_counter() - parse_started
+                found_search_result = decoder.found_search_result
+                total_pages = decoder.total_pages
+                parsed = len(decoded)
+        if context.executor is not None:
+            # The connection is back in the pool before the body is parsed.
+            parse_started = time.perf_counter()
+            decoded_page = await asyncio.get_running_loop().run_in_executor(
+                context.executor,
+                decode_page,
+                body,
+                request_key(request),
+                context.response_format,
+                context.cache is not None,
+            )
+            parse_seconds = time.perf_counter() - parse_started
+            results = drop_settled_decoded(context, request, decoded_page)
+            decoded = decoded_page.records
+            found_search_result = decoded_page.found_search_result
+            total_pages = decoded_page.total_pages
+            parsed = decoded_page.parsed
+        if timing is not None:
+            timing.body_received = time.perf_counter()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        if status == "error":
+            metrics.responses.inc(category, status)
+        raise TransientError(keyword, repr(error)) from error
+    except DECODE_ERRORS as error:
+        # A truncated body surfaces above as a ClientPayloadError, so a body that
+        # arrived whole and still fails to decode will fail the same way again.
+        raise PermanentError(keyword, repr(error)) from error
+    finally:
+        if timing is not None:
+            timing.parse = parse_seconds
+            context.tracer.record(timing)
+    metrics.items_parsed.inc(category, amount=parsed)
+    if not found_search_result:
         print(f"No 'searchResult' found in the response for {keyword}.")
-        return keyword, []
+        return {member: [] for member in request.keywords}, 0
+    if context.cache is not None:
+        context.cache.put(url, decoded, total_pages)
+    claim_listings(context, request, results)
+    metrics.items_accepted.inc(
+        category, amount=sum(len(listings) for listings in results.values())
+    )
+    metrics.request_seconds.observe(category, value=time.perf_counter() - started)
+    # Cached pages were recorded when they were fetched, so only fresh ones are.
+    if context.history is not None:
+        context.history.add(request.category, results)
+    return results, total_pages
+
+async def fetch_pages(context, request):
+    """Async generator over the pages of a search, yielding accepted listings per keyword.
+
+    Cached pages are filtered straight away without waiting on the scheduler.
+    """
+    gen_info = context.infos[request.category]
+    matcher = gen_info.title_filter.request_matcher(request)
+    page = 1
+    while True:
+        hit = (
+            context.cache.get(request.page_url(page), gen_info.category.cache_ttl)
+            if context.cache is not None
+            else None
+        )
+        if hit is not None:
+            records, total_pages = hit
+            results = {member: [] for member in request.keywords}
+            records = drop_settled(context, request, records)
+            filter_records(matcher, records, results, context.telemetry)
+            claim_listings(context, request, results)
+            context.cached.add(request)
+            context.metrics.cached_pages.inc(request.category)
+            context.metrics.items_accepted.inc(
+                request.category,
+                amount=sum(len(listings) for listings in results.values()),
+            )
+        else:
+            results, total_pages = await context.scheduler.submit(
+                fetch_page, context, matcher, request, page
+            )
+        yield results
+        if page >= min(total_pages, context.max_pages):
+            return
+        page += 1
+
+async def fetch_data(context, request):
+    """Async method to fetch info about cards or cpus quickly.
+
+    Pulls pages until every keyword has min_candidates accepted listings or the
+    search runs out of pages, and returns the request with the cheapest
+    accepted listings for each keyword it covers.
+    """
+    top_k = context.infos[request.category].top_k
+    # Registered up front so a search cancelled at the deadline keeps its pages.
+    results = context.progress[request] = {
+        member: TopK(top_k) for member in request.keywords
+    }
+    pages = fetch_pages(context, request)
+    pages_read = 0
+    try:
+        async for page_results in pages:
+            pages_read += 1
+            for keyword, listings in page_results.items():
+                results[keyword].extend(listings)
+            if all(
+                cheapest.seen >= context.min_candidates for cheapest in results.values()
+            ):
+                break
+    except Exception as error:
+        if not isinstance(error, FetchError):
+            # A bug or an unforeseen response fails this search, not the run.
+            print(f"Unexpected error while searching {request.keyword}:")
+            traceback.print_exc()
+            error = FetchError(
+                request.keyword, f"unexpected {type(error).__name__}: {error}"
+            )
+        if pages_read == 0:
+            raise error
+        print(f"Stopped after page {pages_read} for {request.keyword}: {error}")
+    finally:
+        await pages.aclose()
+    return request, results
+
+async def fetch_all(context, requests, timeout=None):
+    """Fetches every request, with a FetchError in place of the result of any that fail.
+
+    Searches still running after timeout seconds are cancelled and returned
+    separately, as (request, listings found so far) pairs.
+    """
+    tasks = [asyncio.ensure_future(fetch_data(context, request)) for request in requests]
+    if not tasks:
+        return [], []
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    # Lets the cancelled searches close their responses before returning.
+    await asyncio.gather(*pending, return_exceptions=True)
+    fetched = [
+        task.exception() or task.result() for task in tasks if task in done
+    ]
+    cut_short = [
+        (request, context.progress[request])
+        for request, task in zip(requests, tasks)
+        if task in pending
+    ]
+    return fetched, cut_short
 
 @dataclass
 class GeneralInfo:
-    """Data class to encapsulate general info."""
+    """Data class to encapsulate general info for one category."""
+    category: Category
+    endpoint: str = ENDPOINT
+    batch_size: int = 0
+    broad: bool = False
+    page_size: int = PAGE_SIZE
+    top_k: int = TOP_K
+    response_format: str = RESPONSE_FORMAT
     csv_filename: str = field(init=False)
     data_list: List[str] = field(init=False)
-    all_prices: Dict[str, List[float]] = field(init=False)
-    lowest_prices: Dict[str, tuple] = field(default_factory=dict)
+    requests: List[FindingRequest] = field(init=False)
+    title_filter: TitleFilter = field(init=False)
+    all_prices: Dict[str, TopK] = field(init=False)
+    lowest_prices: Dict[str, Listing] = field(default_factory=dict)
 
     def __post_init__(self):
-        self.csv_filename = (
-            "Website/CSVs/gpu_info.csv" if SEARCHGPUS else "Website/CSVs/cpu_info.csv"
+        self.csv_filename = self.category.csv_filename
+        self.data_list = self.category.load_catalog()
+        builder = RequestBuilder(
+            self.endpoint,
+            {**params, "RESPONSE-DATA-FORMAT": self.response_format},
+            self.category.key,
+            self.page_size,
         )
-        self.data_list = card_names if SEARCHGPUS else cpus
-        self.all_prices = {item: [] for item in self.data_list}
+        broad_queries = self.category.broad_queries if self.broad else ()
+        if broad_queries:
+            self.requests = plan_broad_requests(builder, self.data_list, broad_queries)
+        elif self.batch_size > 1 and self.category.batchable:
+            self.requests = plan_requests(builder, self.data_list, self.batch_size)
+        elif self.category.search_query:
+            self.requests = plan_search_requests(
+                builder, self.data_list, self.category.search_query
+            )
+        else:
+            self.requests = builder.build_all(self.data_list)
+        self.title_filter = TitleFilter(
+            self.category.banned_words,
+            self.category.extract_number,
+            self.category.extract_superlative,
+            ComponentIndex(self.data_list) if broad_queries else None,
+        )
+        self.all_prices = {item: TopK(self.top_k) for item in self.data_list}
+
+    def reset(self):
+        """Clears the listings and prices of a previous refresh."""
+        self.all_prices = {item: TopK(self.top_k) for item in self.data_list}
+        self.lowest_prices = {}
 
 def update_csv(gen_info):
     """Read in csv data and update"""
@@ -172,36 +490,10 @@ def update_csv(gen_info):
 
     if csv_data:
         for row in csv_data:
-            name = row["Card"] if SEARCHGPUS else row["Name"]
-            if name in gen_info.lowest_prices:
-                ebay_price, _, ebay_url, _ = gen_info.lowest_prices[name]
-                row["Price ($)"] = f"{ebay_price:,.2f}"
-                row["URL"] = ebay_url
-            fps_or_score = float(row["FPS"]) if SEARCHGPUS else float(row["Score"])
-            watts = float(row["TDP"])
-            row["Power Efficiency (FPS/W)"] = (
-                f"{(fps_or_score / watts) if watts != 0 else float('inf'):.4f}"
-            )
-            price = float(row["Price ($)"].replace(",", ""))
-            if SEARCHGPUS:
-                row["Price Efficiency (FPS/$)"] = (
-                    f"{(fps_or_score / price) if price != 0 else float('inf'):.4f}"
-                )
-                price_efficiency = float(row["Price Efficiency (FPS/$)"])
-                power_efficiency = float(row["Power Efficiency (FPS/W)"])
-            if SEARCHCPUS:
-                row["Price Efficiency (Score/$)"] = (
-                    f"{(fps_or_score / price) if price != 0 else float('inf'):.4f}"
-                )
-                price_efficiency = float(row["Price Efficiency (Score/$)"])
-                power_efficiency = float(row["Power Efficiency (Score/W)"])
-            row["Average Efficiency"] = (
-                f"{(price_efficiency + power_efficiency) / 2:.4f}"
-            )
+            name = row[gen_info.category.name_column]
+            gen_info.category.update_row(row, gen_info.lowest_prices.get(name))
 
-        with open(
-            gen_info.csv_filename, mode="w", newline="", encoding="utf-8"
-        ) as file:
+        with atomic_write(gen_info.csv_filename, newline="") as file:
             fieldnames = csv_data[0].keys()
             writer = csv.DictWriter(file, fieldnames=fieldnames)
             writer.writeheader()
@@ -212,39 +504,701 @@ def update_csv(gen_info):
         print("No data found in the CSV file to process.")
 
 
-async def main():
-    """Fetches the info and does some parsing/analysis"""
-    gen_info = GeneralInfo()
-
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_data(session, item) for item in gen_info.data_list]
-        results = await asyncio.gather(*tasks)
-
-    for keyword, prices in results:
-        gen_info.all_prices[keyword] = prices
-
-    def _check_low_prices():
-        """Internal function to just clarify a bit"""
-        lowest_prices = {}
-        for name, prices in gen_info.all_prices.items():
-            if prices:
-                sorted_prices = sorted(prices, key=lambda x: x[0])
-                other_prices = [price for price, _, _, _ in sorted_prices[1:]]
-                average_price = (
-                    sum(other_prices) / len(other_prices)
-                    if other_prices
-                    else float("inf")
+def select_lowest_prices(infos, selector, index=None):
+    """Picks every category's lowest prices in one pass over all listings.
+
+    With an index, listings later claimed by a better-matching component are
+    left out of the one they were first kept for.
+    """
+    tops = {
+        (key, name): cheapest
+        for key, gen_info in infos.items()
+        for name, cheapest in gen_info.all_prices.items()
+    }
+    excluded = (
+        []
+        if index is None
+        else [
+            (owner, item_id)
+            for item_id, owner in index.displaced
+            if not index.owns(item_id, owner)
+        ]
+    )
+    for gen_info in infos.values():
+        gen_info.lowest_prices = {}
+    for (key, name), listing in selector.select(tops, excluded).items():
+        infos[key].lowest_prices[name] = listing
+
+
+def parse_args(argv=None):
+    """Parses the command line options for a refresh run."""
+    parser = argparse.ArgumentParser(
+        description="Fetch the lowest eBay prices and update the component CSVs."
+    )
+    parser.add_argument(
+        "--categories",
+        default=",".join(DEFAULT_CATEGORIES),
+        help=(
+            f"comma separated categories to refresh, of {','.join(CATEGORIES)} "
+            f"(default: {','.join(DEFAULT_CATEGORIES)})"
+        ),
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=MAX_IN_FLIGHT,
+        help="maximum number of requests running at once",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=REQUESTS_PER_SECOND,
+        help="requests per second allowed by the token bucket (0 disables it)",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=LIMIT_PER_HOST,
+        help="maximum open connections per host",
+    )
+    parser.add_argument(
+        "--attempts",
+        type=int,
+        default=MAX_ATTEMPTS,
+        help="attempts per keyword before it is reported as failed",
+    )
+    parser.add_argument(
+        "--max-retry-after",
+        type=float,
+        default=MAX_RETRY_AFTER,
+        help="longest Retry-After, in seconds, a 429 is retried after; "
+        "longer ones fail the keyword",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only refresh components whose staleness times volatility reaches --budget",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=REFRESH_BUDGET,
+        help="staleness (hours) times volatility needed to refresh a component",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        help="listings per page, at most 100",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=MAX_PAGES,
+        help="maximum pages read per search",
+    )
+    parser.add_argument(
+        "--min-candidates",
+        type=int,
+        default=MIN_CANDIDATES,
+        help="stop paging once every keyword has this many accepted listings",
+    )
+    parser.add_argument(
+        "--format",
+        type=str.upper,
+        choices=sorted(DECODERS),
+        default=RESPONSE_FORMAT,
+        help="response format to request and decode",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="decode and filter responses in a pool of this many workers "
+        "instead of on the event loop (default 0, off)",
+    )
+    parser.add_argument(
+        "--pool",
+        choices=sorted(POOLS),
+        default="process",
+        help="kind of worker pool used with --workers",
+    )
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=TOP_K,
+        help="cheapest listings kept per component for price selection",
+    )
+    parser.add_argument(
+        "--outlier-method",
+        choices=sorted(DEFAULT_THRESHOLDS),
+        default=OUTLIER_METHOD,
+        help="robust statistic used to reject suspiciously cheap listings",
+    )
+    parser.add_argument(
+        "--outlier-threshold",
+        type=float,
+        help="fence width in MADs or IQRs below the typical price "
+        "(default 3 for mad, 1.5 for iqr)",
+    )
+    parser.add_argument(
+        "--history",
+        default=HISTORY_DB,
+        help="SQLite database the price history is appended to",
+    )
+    parser.add_argument(
+        "--no-history", action="store_true", help="do not record price history"
+    )
+    parser.add_argument(
+        "--filter-stats",
+        default=FILTER_STATS,
+        help="JSON file for the filter counters and sampled rejected titles",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=METRICS_FILE,
+        help="Prometheus textfile the run's request, item and latency metrics "
+        "are written to",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="time the DNS, connect, time-to-first-byte, transfer and parse "
+        "phases of every request and print their percentiles",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_DIR,
+        metavar="DIR",
+        help="profile the fetch, parse, select and write stages of each refresh "
+        f"into a new folder under DIR (default {PROFILE_DIR})",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=TRACE_FILE,
+        help="CSV file for the per-keyword request timings written with --trace",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="search closely related keywords together in one OR query",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="maximum keywords combined into one batched query",
+    )
+    parser.add_argument(
+        "--broad",
+        action="store_true",
+        help="search whole product lines (e.g. GeForce RTX) and classify each "
+        "listing to a component, instead of one query per GPU or CPU",
+    )
+    parser.add_argument(
+        "--endpoint",
+        default=ENDPOINT,
+        help="Finding API endpoint (defaults to $EBAY_ENDPOINT or the live service)",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=None,
+        help="reuse cached responses up to this many seconds old, overriding the "
+        "category TTL (0 always refetches)",
+    )
+    parser.add_argument(
+        "--cache-dir", default=CACHE_DIR, help="folder for cached responses"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="neither read nor write the cache"
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="seconds the whole refresh may take; searches still running when "
+        "the fetch budget is spent are cancelled and what was found is written",
+    )
+    parser.add_argument(
+        "--stage-shares",
+        type=parse_shares,
+        default=STAGE_SHARES,
+        help="shares of --deadline for the fetch, select and write stages "
+        f"(default {STAGE_SHARES})",
+    )
+    parser.add_argument(
+        "--freshness",
+        default=FRESHNESS,
+        help="JSON file recording whether each component was refreshed fully, "
+        "partially or not at all",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help="refresh only shard i of N (e.g. 2/4) and write partial results "
+        f"to {SHARD_DIR} instead of the CSVs",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        type=int,
+        metavar="N",
+        help="write the partial results of N shards into the CSVs and exit",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and refresh every --interval seconds over one session",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DAEMON_INTERVAL,
+        help="seconds between the starts of daemon refresh cycles",
+    )
+    parser.add_argument(
+        "--status-port",
+        type=int,
+        default=None,
+        help="serve the daemon status as JSON on this port",
+    )
+    args = parser.parse_args(argv)
+    args.categories = [key.strip() for key in args.categories.split(",") if key.strip()]
+    unknown = [key for key in args.categories if key not in CATEGORIES]
+    if unknown:
+        parser.error(f"unknown categories: {', '.join(unknown)}")
+    return args
+
+
+async def refresh(
+    args,
+    infos,
+    scheduler,
+    session,
+    cache,
+    refresh_state,
+    history,
+    executor=None,
+    metrics=None,
+    tracer=None,
+):
+    """Runs one refresh: fetch, pick the lowest prices and write the CSVs.
+
+    With a deadline, searches still running when the fetch budget is spent are
+    cancelled and the components they had found listings for are written as
+    partial. Metrics accumulate in metrics across refreshes and are written
+    to the textfile at the end of each one. With a tracer, whose TraceConfig
+    the session was built with, every page request is timed. With
+    --profile, each stage is profiled into a folder of its own per refresh.
+    """
+    metrics = IngestMetrics() if metrics is None else metrics
+    deadline = RunDeadline(args.deadline, args.stage_shares)
+    scheduler.reset_stats()
+    if tracer is not None:
+        tracer.reset()
+    profiler = StageProfiler() if args.profile else None
+    if profiler is not None:
+        profiler.start()
+    for gen_info in infos.values():
+        gen_info.reset()
+
+    requests = []
+    for key, gen_info in infos.items():
+        planned = gen_info.requests
+        if args.shard is not None:
+            planned = [request for request in planned if args.shard.owns(request)]
+        if not args.incremental:
+            requests += planned
+            continue
+        due = set(refresh_state.due(key, gen_info.data_list, args.budget))
+        requests += [
+            request
+            for request in planned
+            if any(keyword in due for keyword in request.keywords)
+        ]
+        print(f"Incremental run: {len(due)} of {len(gen_info.data_list)} {key} components are due.")
+    if args.shard is not None:
+        print(f"Shard {args.shard.index}/{args.shard.count}: {len(requests)} requests.")
+
+    telemetry = FilterTelemetry(FILTER_SAMPLE_SIZE)
+    index = ItemIndex()
+    writer = None if history is None else HistoryWriter(history, index.owns)
+    context = FetchContext(
+        scheduler,
+        session,
+        infos,
+        cache,
+        writer,
+        executor,
+        args.format,
+        telemetry,
+        args.max_pages,
+        args.min_candidates,
+        index,
+        metrics=metrics,
+        tracer=tracer,
+        profiler=profiler,
+    )
+    with deadline.stage("fetch") as timeout, profiled(profiler, "fetch"):
+        fetched, cut_short = await fetch_all(context, requests, timeout)
+    # Every planned component is stale until its search returns listings.
+    freshness = {key: {} for key in infos}
+    for request in requests:
+        freshness[request.category].update(dict.fromkeys(request.keywords, STALE))
+    results = []
+    failures = []
+    for result in fetched:
+        if isinstance(result, FetchError):
+            failures.append(result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            results.append(result)
+            request, by_keyword = result
+            flag = CACHED if request in context.cached else FRESH
+            freshness[request.category].update(dict.fromkeys(by_keyword, flag))
+    for request, by_keyword in cut_short:
+        found = {
+            keyword: cheapest
+            for keyword, cheapest in by_keyword.items()
+            if cheapest.seen
+        }
+        results.append((request, found))
+        freshness[request.category].update(dict.fromkeys(found, PARTIAL))
+    print(
+        f"Fetched {scheduler.completed} requests at "
+        f"{scheduler.throughput():.2f} requests/s "
+        f"({scheduler.retries} retries)."
+    )
+    if failures:
+        print(f"{len(failures)} keywords failed and keep their previous price:")
+        for error in failures:
+            print(f"  {error}")
+    if cut_short:
+        partial = sum(
+            flag == PARTIAL for flags in freshness.values() for flag in flags.values()
+        )
+        print(
+            f"Deadline reached: {len(cut_short)} searches were cancelled; "
+            f"{partial} components are written from the pages already read, "
+            "the rest keep their previous price."
+        )
+    if cache is not None:
+        print(f"Response cache: {cache.hits} hits, {cache.misses} misses.")
+    reasons = ", ".join(
+        f"{reason}: {count}" for reason, count in telemetry.by_reason().most_common()
+    )
+    print(
+        f"Filtered listings: {sum(telemetry.accepted.values())} accepted, "
+        f"{sum(telemetry.rejected.values())} rejected ({reasons or 'none'})."
+    )
+    print(
+        f"Duplicate listings: {context.index.duplicates} seen again, "
+        "each kept only for its best-matching component."
+    )
+    telemetry.write(
+        args.filter_stats
+        if args.shard is None
+        else shard_filename(args.filter_stats, args.shard)
+    )
+    if tracer is not None:
+        tracer.print_summary()
+        trace_file = (
+            args.trace_file
+            if args.shard is None
+            else shard_filename(args.trace_file, args.shard)
+        )
+        tracer.write_table(trace_file)
+        print(f"Per-keyword request timings have been written to '{trace_file}'")
+
+    for request, by_keyword in results:
+        infos[request.category].all_prices.update(by_keyword)
+
+    with deadline.stage("select"), profiled(profiler, "select"):
+        select_lowest_prices(
+            infos,
+            PriceSelector(args.outlier_method, args.outlier_threshold),
+            context.index,
+        )
+
+    with deadline.stage("write"), profiled(profiler, "write"):
+        if writer is not None:
+            appended = writer.finish()
+            # Listings written before a better-matching search took them over
+            # stay only under the component that now owns them.
+            removed = history.remove_listings(
+                [
+                    (*owner, item_id)
+                    for item_id, owner in index.displaced
+                    if not index.owns(item_id, owner)
+                ],
+                writer.started_at,
+            )
+        for key, gen_info in infos.items():
+            if args.shard is None:
+                with profiled(profiler, "csv_write"):
+                    update_csv(gen_info)
+            if history is not None:
+                history.add_lowest(key, gen_info.lowest_prices)
+        if history is not None:
+            appended += history.commit() - removed
+            print(f"Price history: {appended} rows appended to {history.path}.")
+
+        # Cached pages say nothing new about a price, so only searches answered
+        # entirely from the network count as a refresh.
+        refreshed = {key: {} for key in infos}
+        for request, by_keyword in results:
+            if request in context.cached:
+                continue
+            for keyword in by_keyword:
+                lowest = infos[request.category].lowest_prices.get(keyword)
+                refreshed[request.category][keyword] = lowest.price if lowest else None
+        if args.shard is not None:
+            # The merge applies the refresh state, so shards never write a shared file.
+            for key, gen_info in infos.items():
+                path = shard_filename(os.path.join(SHARD_DIR, f"{key}.json"), args.shard)
+                write_partial(
+                    path, gen_info.lowest_prices, refreshed[key], freshness[key]
                 )
-                for price, title, url, condition in sorted_prices:
-                    if price >= 0.40 * average_price:
-                        lowest_prices[name] = (price, title, url, condition)
-                        break
-        return lowest_prices
+                print(f"Partial results have been written to '{path}'")
+        else:
+            for key, prices in refreshed.items():
+                for keyword, price in prices.items():
+                    refresh_state.update(key, keyword, price)
+            refresh_state.save()
+            update_freshness(args.freshness, freshness)
+
+    # Evicted only once the results are written, so a failure here can never
+    # cost a refresh its output.
+    if cache is not None:
+        cache.evict()
+
+    if profiler is not None:
+        profiler.stop()
+        profile_dir = os.path.join(args.profile, time.strftime("%Y%m%d-%H%M%S"))
+        if args.shard is not None:
+            profile_dir += f"-{args.shard.label}"
+        profiler.write(profile_dir)
+        print(f"Stage profiles have been written to '{profile_dir}'")
+    for stage, seconds in deadline.elapsed.items():
+        metrics.stage_seconds.observe(stage, value=seconds)
+    metrics.failures.inc(amount=len(failures))
+    for request, _ in cut_short:
+        metrics.cut_short.inc(request.category)
+    metrics.runs.inc()
+    metrics.last_run.set(value=time.time())
+    metrics.registry.write_textfile(
+        args.metrics_file
+        if args.shard is None
+        else shard_filename(args.metrics_file, args.shard)
+    )
+    return {
+        "requests": len(requests),
+        "pages_fetched": scheduler.completed,
+        "retries": scheduler.retries,
+        "failures": len(failures),
+        "listings_accepted": sum(telemetry.accepted.values()),
+        "listings_rejected": sum(telemetry.rejected.values()),
+        "listings_duplicate": context.index.duplicates,
+        "searches_cut_short": len(cut_short),
+        "stage_seconds": deadline.elapsed,
+        "throughput": scheduler.throughput(),
+    }
+
+
+def merge_shards(args, infos, refresh_state):
+    """Writes the partial results of every shard into the category CSVs."""
+    merged = []
+    for key, gen_info in infos.items():
+        partials, missing = read_partials(
+            os.path.join(SHARD_DIR, f"{key}.json"), args.merge_shards
+        )
+        if missing:
+            print(f"No partial results for {key} shards {', '.join(missing)}; "
+                  "their components keep their previous price.")
+        if not partials:
+            continue
+        gen_info.reset()
+        for partial in partials.values():
+            gen_info.lowest_prices.update(
+                (name, Listing(*fields))
+                for name, fields in partial["lowest_prices"].items()
+            )
+            for name, price in partial["refreshed"].items():
+                refresh_state.update(key, name, price, now=partial["written_at"])
+            update_freshness(
+                args.freshness,
+                {key: partial.get("freshness", {})},
+                partial["written_at"],
+            )
+        update_csv(gen_info)
+        merged.extend(partials)
+    refresh_state.save()
+    # Merged partials are removed so a later merge cannot apply stale prices.
+    for path in merged:
+        os.remove(path)
+    if not args.no_history:
+        merge_shard_histories(args.history, args.merge_shards)
+
+
+def merge_shard_histories(path, count):
+    """Appends the price history each shard recorded to the main database."""
+    history = PriceHistory(path)
+    try:
+        for index in range(1, count + 1):
+            shard_path = shard_filename(path, Shard(index, count))
+            if not os.path.exists(shard_path):
+                continue
+            copied = history.merge(shard_path)
+            print(f"Price history: {copied} rows merged from {shard_path}.")
+            # Removed once merged so a later merge cannot append the rows twice.
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(shard_path + suffix):
+                    os.remove(shard_path + suffix)
+    finally:
+        history.close()
 
-    gen_info.lowest_prices = _check_low_prices()
 
-    update_csv(gen_info)
+async def run_daemon(
+    args, infos, scheduler, cache, refresh_state, history, executor, metrics, tracer
+):
+    """Refreshes on a schedule over one long-lived session until interrupted."""
+    connector = scheduler.connector(
+        keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL
+    )
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        trace_configs=[tracer.trace_config()] if tracer is not None else None,
+    ) as session:
+        daemon = RefreshDaemon(
+            lambda: refresh(
+                args,
+                infos,
+                scheduler,
+                session,
+                cache,
+                refresh_state,
+                history,
+                executor,
+                metrics,
+                tracer,
+            ),
+            args.interval,
+        )
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, daemon.stop)
+        runner = None
+        if args.status_port is not None:
+            runner = await start_status_server(
+                daemon, STATUS_HOST, args.status_port, metrics.registry
+            )
+        try:
+            await daemon.run()
+        finally:
+            if runner is not None:
+                await runner.cleanup()
+
+
+async def main(args=None):
+    """Fetches the info for every category in one event loop and session"""
+    if args is None:
+        args = parse_args([])
+    infos = {
+        key: GeneralInfo(
+            CATEGORIES[key],
+            endpoint=args.endpoint,
+            batch_size=args.batch_size if args.batch else 0,
+            broad=args.broad,
+            page_size=args.page_size,
+            top_k=args.top_k,
+            response_format=args.format,
+        )
+        for key in args.categories
+    }
+    scheduler = FetchScheduler(
+        args.max_in_flight,
+        args.rps,
+        args.per_host,
+        RetryPolicy(args.attempts, max_retry_after=args.max_retry_after),
+        CircuitBreaker(threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN),
+    )
+    max_age = args.max_age
+    if args.daemon:
+        cycle_age = args.interval * DAEMON_CACHE_SHARE
+        max_age = cycle_age if max_age is None else min(max_age, cycle_age)
+    cache = (
+        None
+        if args.no_cache
+        else ResponseCache(args.cache_dir, CACHE_MAX_BYTES, max_age)
+    )
+    refresh_state = RefreshState(REFRESH_STATE)
+    if args.merge_shards:
+        merge_shards(args, infos, refresh_state)
+        return
+    # Each shard appends to a database of its own, folded in by --merge-shards.
+    history = (
+        None
+        if args.no_history
+        else PriceHistory(
+            args.history
+            if args.shard is None
+            else shard_filename(args.history, args.shard)
+        )
+    )
+    executor = (
+        make_executor(
+            args.pool,
+            args.workers,
+            {key: gen_info.title_filter for key, gen_info in infos.items()},
+            [request for gen_info in infos.values() for request in gen_info.requests],
+        )
+        if args.workers
+        else None
+    )
+    metrics = IngestMetrics()
+    tracer = RequestTracer() if args.trace else None
+
+    try:
+        if args.daemon:
+            await run_daemon(
+                args,
+                infos,
+                scheduler,
+                cache,
+                refresh_state,
+                history,
+                executor,
+                metrics,
+                tracer,
+            )
+            return
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(
+            connector=scheduler.connector(),
+            timeout=timeout,
+            trace_configs=[tracer.trace_config()] if tracer is not None else None,
+        ) as session:
+            await refresh(
+                args,
+                infos,
+                scheduler,
+                session,
+                cache,
+                refresh_state,
+                history,
+                executor,
+                metrics,
+                tracer,
+            )
+    finally:
+        if history is not None:
+            history.close()
+        if executor is not None:
+            executor.shutdown()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file
@@ -4,9 +4,11 @@
 PYTHON_SCRIPT="query.py"
 WEBSITE_SCRIPT="app.py"
 
-# Run queries
-echo "Running Queries..."
-# python3 "$PYTHON_SCRIPT"
+# Run queries in the background, refreshing due components every hour
+echo "Starting Query Daemon..."
+python3 "$PYTHON_SCRIPT" --daemon --incremental --status-port 8090 &
+DAEMON_PID=$!
+trap 'kill $DAEMON_PID' EXIT
 
 
 # Run webserver